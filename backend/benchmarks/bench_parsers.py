@@ -0,0 +1,70 @@
+"""
+Parses the saved LinkedIn result pages with every available parser backend and
+reports cards per second. Also checks that all backends extract identical jobs.
+
+    python -m benchmarks.bench_parsers [--rounds 20] [--json] [pages...]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from scrapers.parsers import PARSERS, available_parsers
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "linkedin", "*.html")
+
+
+def load_corpus(paths):
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    return pages
+
+
+def bench(parser, pages, rounds: int) -> dict:
+    cards = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            cards += len(parser(html))
+    elapsed = time.perf_counter() - start
+    return {
+        "cards": cards,
+        "seconds": round(elapsed, 4),
+        "cards_per_second": round(cards / elapsed, 1),
+        "ms_per_page": round(1000 * elapsed / (rounds * len(pages)), 3),
+    }
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("pages", nargs="*", help="saved result pages (default: bundled fixtures)")
+    arg_parser.add_argument("--rounds", type=int, default=20)
+    arg_parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = arg_parser.parse_args()
+
+    pages = load_corpus(args.pages or sorted(glob.glob(DEFAULT_CORPUS)))
+    backends = available_parsers()
+
+    reference = [PARSERS[backends[-1]](html) for html in pages]
+    results = {}
+    for name in backends:
+        parser = PARSERS[name]
+        results[name] = bench(parser, pages, args.rounds)
+        results[name]["matches_reference"] = [parser(html) for html in pages] == reference
+
+    if args.json:
+        print(json.dumps({"pages": len(pages), "rounds": args.rounds, "backends": results}, indent=2))
+    else:
+        print(f"{len(pages)} pages x {args.rounds} rounds")
+        for name, result in results.items():
+            print(f"{name:>12}: {result['cards_per_second']:>10.1f} cards/s  "
+                  f"{result['ms_per_page']:>8.3f} ms/page  matches bs4: {result['matches_reference']}")
+    return 0 if all(result["matches_reference"] for result in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Cold-start benchmark: measures, in fresh interpreter processes, how long
+`import main` takes and how long until /ready reports the warm-up finished.
+
+    cd backend
+    python -m benchmarks.bench_startup --rounds 5
+    python -m benchmarks.bench_startup --json
+
+Run it on two commits to compare startup before and after a change. Trees
+without a /ready endpoint only report import time.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a child process so every round starts with cold module caches
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+ready = None
+if any(getattr(route, "path", "") == "/ready" for route in main.app.routes):
+    from fastapi.testclient import TestClient
+    with TestClient(main.app) as client:
+        while client.get("/ready").status_code != 200:
+            time.sleep(0.005)
+        ready = time.perf_counter() - start
+heavy = [name for name in ("google.generativeai", "pdfplumber", "bs4") if name in sys.modules]
+print(json.dumps({"import_s": imported, "ready_s": ready, "heavy_modules_at_import": heavy}))
+"""
+
+# Only the import, so heavy modules loaded by warm-up are not counted
+IMPORT_ONLY = """
+import json, sys
+import main
+print(json.dumps([name for name in ("google.generativeai", "pdfplumber", "bs4") if name in sys.modules]))
+"""
+
+
+def run_probe(code: str):
+    env = dict(os.environ, ANALYSIS_CACHE_DB="", ROADMAP_WARMUP_FIELDS="")
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    runs = [run_probe(PROBE) for _ in range(args.rounds)]
+    imports = [run["import_s"] for run in runs]
+    readies = [run["ready_s"] for run in runs if run["ready_s"] is not None]
+    results = {
+        "rounds": args.rounds,
+        "import_median_ms": round(1000 * statistics.median(imports), 1),
+        "import_min_ms": round(1000 * min(imports), 1),
+        "ready_median_ms": round(1000 * statistics.median(readies), 1) if readies else None,
+        "heavy_modules_at_import": run_probe(IMPORT_ONLY),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"import main:  {results['import_median_ms']:8.1f} ms median ({results['import_min_ms']:.1f} ms min)")
+    if results["ready_median_ms"] is not None:
+        print(f"until /ready: {results['ready_median_ms']:8.1f} ms median")
+    print(f"heavy modules loaded by import: {', '.join(results['heavy_modules_at_import']) or 'none'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,62 @@
+"""
+Offline check of the multi-source job search runner: one healthy stub source,
+one that overruns its deadline, one that raises, and LinkedIn pointed at a
+server that answers 503. Verifies each source gets its own status, the slow
+source is cut off at its deadline, and the healthy results still come back.
+
+    cd backend
+    python -m benchmarks.check_sources
+"""
+import asyncio
+import sys
+import time
+
+import httpx
+
+from benchmarks.stub_sources import StubSource
+from scrapers import LinkedInSource, search_sources
+from scrapers import linkedin_scraper
+
+JOBS = [
+    {"title": "Data Scientist", "company": "Acme", "location": "Remote", "url": "https://example.com/jobs/1"},
+    {"title": "ML Engineer", "company": "Globex", "location": "Remote", "url": "https://example.com/jobs/2"},
+]
+SLOW_DELAY = 2.0
+DEADLINE = 0.2
+
+
+async def run() -> int:
+    linkedin_scraper._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+    linkedin = LinkedInSource()
+    linkedin.deadline = DEADLINE
+    sources = [
+        StubSource("healthy", JOBS),
+        StubSource("slow", JOBS, delay=SLOW_DELAY, deadline=DEADLINE),
+        StubSource("broken", JOBS, error="upstream exploded"),
+        linkedin,
+    ]
+    start = time.perf_counter()
+    jobs, report = await search_sources(sources, "data scientist", "remote", [])
+    elapsed = time.perf_counter() - start
+    await linkedin_scraper.close_client()
+
+    expected = {"healthy": "ok", "slow": "timeout", "broken": "error", "linkedin": "error"}
+    failures = [
+        f"{name}: expected {status}, got {report[name]['status']}"
+        for name, status in expected.items() if report[name]["status"] != status
+    ]
+    if len(jobs) != len(JOBS):
+        failures.append(f"expected {len(JOBS)} jobs from the healthy source, got {len(jobs)}")
+    if elapsed >= SLOW_DELAY:
+        failures.append(f"search took {elapsed:.2f}s; the slow source was not cut off at its deadline")
+
+    for name, status in report.items():
+        print(f"{name:10} {status['status']:8} {status['count']:3} jobs {status['elapsed_ms']:8.1f} ms  {status.get('error', '')}")
+    print(f"total      {elapsed * 1000:.1f} ms")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))
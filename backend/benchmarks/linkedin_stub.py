@@ -0,0 +1,50 @@
+"""
+Local stand-in for LinkedIn's job search page, serving the recorded result pages
+in fixtures/linkedin/. Point the scraper at it with LINKEDIN_BASE_URL:
+
+    uvicorn benchmarks.linkedin_stub:app --port 9000
+    LINKEDIN_BASE_URL=http://localhost:9000 uvicorn main:app
+
+It can also be used in-process via httpx.ASGITransport(app=app).
+
+STUB_LATENCY (seconds) delays every response, and STUB_429_EVERY=n answers every
+n-th request with a 429 to exercise the scraper's backoff.
+"""
+import asyncio
+import glob
+import os
+from itertools import count
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, Response
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "linkedin")
+PAGE_SIZE = 25
+STUB_LATENCY = float(os.getenv("STUB_LATENCY", "0"))
+STUB_429_EVERY = int(os.getenv("STUB_429_EVERY", "0"))
+
+EMPTY_PAGE = "<html><body><ul class=\"jobs-search__results-list\"></ul></body></html>"
+
+
+def load_pages():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "search_page_*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    return pages
+
+
+PAGES = load_pages()
+_requests = count(1)
+
+app = FastAPI()
+
+
+@app.get("/jobs/search/")
+async def search(request: Request, start: int = 0) -> Response:
+    if STUB_LATENCY:
+        await asyncio.sleep(STUB_LATENCY)
+    if STUB_429_EVERY and next(_requests) % STUB_429_EVERY == 0:
+        return Response(status_code=429, headers={"Retry-After": "0"})
+    page = start // PAGE_SIZE
+    return HTMLResponse(PAGES[page] if page < len(PAGES) else EMPTY_PAGE)
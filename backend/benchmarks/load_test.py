@@ -0,0 +1,369 @@
+"""
+Offline load and latency benchmark. Boots the FastAPI app from main.py
+in-process, replaces the Gemini model with a fake of configurable latency and
+points the LinkedIn scraper at the recorded-page stub, then drives
+/analyze_resume, /generate_roadmap and /get_job_postings at a fixed
+concurrency. Reports p50/p95/p99 latency, requests per second and peak RSS per
+endpoint as JSON. Peak RSS is sampled while each endpoint runs and covers the
+server process plus the PDF worker processes.
+
+    cd backend
+    python -m benchmarks.load_test --requests 200 --concurrency 16 --output bench.json
+    python -m benchmarks.load_test --compare bench.json   # after a change
+
+Sample resumes are generated PDFs unless --pdf-dir points at real ones. By
+default every analysis request uses a distinct resume so the analysis cache
+does not hide the work; pass --repeat-resumes to measure cache hits instead.
+Roadmap prefetching is off so /generate_roadmap measures generation rather
+than hits on roadmaps prefetched by /analyze_resume.
+"""
+import argparse
+import asyncio
+import atexit
+import glob
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+# Configure the app for offline use before it is imported
+_STATE_DIR = tempfile.mkdtemp(prefix="resume-bench-")
+atexit.register(shutil.rmtree, _STATE_DIR, ignore_errors=True)
+os.environ.setdefault("ANALYSIS_CACHE_DB", os.path.join(_STATE_DIR, "cache.sqlite3"))
+os.environ.setdefault("POSTINGS_INDEX_DIR", os.path.join(_STATE_DIR, "postings_index"))
+os.environ.setdefault("LINKEDIN_BASE_URL", "http://linkedin-stub")
+os.environ.setdefault("LINKEDIN_RATE_PER_SECOND", "1000")
+os.environ.setdefault("LINKEDIN_RATE_BURST", "1000")
+os.environ.setdefault("ROADMAP_WARMUP_FIELDS", "")
+os.environ.setdefault("ROADMAP_PREFETCH", "0")
+
+import httpx  # noqa: E402
+
+ANALYSIS_REPLY = {
+    "score": 72,
+    "suggestions": [
+        "Quantify the impact of your backend projects.",
+        "Move the skills section above education.",
+        "Add links to deployed projects.",
+    ],
+    "field_of_interest": "Software Engineering",
+    "detailed_analysis": {
+        "overall_assessment": "A solid resume for the role with room for more measurable outcomes.",
+        "strengths": ["Relevant Python experience.", "Production API work."],
+        "weaknesses": ["Few metrics.", "No cloud certifications."],
+        "reasoning_for_field": "Most experience is in software development.",
+    },
+}
+
+ROADMAP_REPLY = {
+    "tutorials": [{"title": "Intro", "link": "https://example.com", "platform": "YouTube", "description": "Basics."}],
+    "certifications": [{"title": "Cert", "link": "https://example.com/cert", "provider": "Org", "description": "Value."}],
+    "projects": [{"title": "Project", "description": "Build it.", "difficulty": "Beginner"}],
+}
+
+JOB_TITLES = ["Software Engineer", "Backend Developer", "Data Scientist", "DevOps Engineer", "Frontend Developer"]
+FIELDS = ["Software Engineering", "Data Science", "DevOps", "Machine Learning", "Cybersecurity", "Web Development"]
+LOCATIONS = ["India", "Bengaluru", "Pune", "Hyderabad"]
+
+RESUME_LINES = [
+    "Jane Doe - Software Engineer",
+    "Experience: Built REST APIs in Python with Django and FastAPI; PostgreSQL, Redis, Docker.",
+    "Deployed services on AWS with Kubernetes and Terraform; CI/CD with GitHub Actions.",
+    "Projects: real-time analytics dashboard (React, TypeScript), resume parser (pandas, scikit-learn).",
+    "Skills: Python, Java, SQL, Git, Linux, unit testing, system design, agile.",
+    "Education: B.Tech Computer Science, 2021.",
+]
+
+
+class _Part:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _Usage:
+    def __init__(self, prompt: str, text: str):
+        # Roughly four characters per token, like Gemini on English text
+        self.prompt_token_count = len(prompt) // 4
+        self.candidates_token_count = len(text) // 4
+
+
+class _Response:
+    def __init__(self, text: str, prompt: str = ""):
+        self.parts = [_Part(text)]
+        self.text = text
+        self.usage_metadata = _Usage(prompt, text) if prompt else None
+
+
+class _Stream:
+    def __init__(self, text: str, chunk_delay: float, prompt: str):
+        self._text = text
+        self._chunk_delay = chunk_delay
+        self.usage_metadata = _Usage(prompt, text)
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for i in range(0, len(self._text), 40):
+            await asyncio.sleep(self._chunk_delay)
+            yield _Response(self._text[i:i + 40])
+
+
+class FakeGeminiModel:
+    """Stands in for genai.GenerativeModel; latency is lognormal around the given median."""
+
+    def __init__(self, median_latency: float, sigma: float = 0.35):
+        self.model_name = "models/fake-gemini"
+        self.median_latency = median_latency
+        self.sigma = sigma
+        self.calls = 0
+
+    def _latency(self) -> float:
+        return self.median_latency * random.lognormvariate(0, self.sigma)
+
+    @staticmethod
+    def _prompt_text(prompt) -> str:
+        return prompt[0] if isinstance(prompt, list) else prompt
+
+    def _reply(self, prompt) -> str:
+        return json.dumps(ROADMAP_REPLY if "career roadmap" in self._prompt_text(prompt) else ANALYSIS_REPLY)
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self._latency())
+        return _Response(self._reply(prompt), self._prompt_text(prompt))
+
+    async def generate_content_async(self, prompt, stream: bool = False, **kwargs):
+        self.calls += 1
+        if stream:
+            return _Stream(self._reply(prompt), self._latency() / 10, self._prompt_text(prompt))
+        await asyncio.sleep(self._latency())
+        return _Response(self._reply(prompt), self._prompt_text(prompt))
+
+    def count_tokens(self, contents):
+        return type("CountTokensResponse", (), {"total_tokens": len(self._prompt_text(contents)) // 4})()
+
+    async def count_tokens_async(self, contents):
+        return self.count_tokens(contents)
+
+
+def make_pdf(lines: List[str]) -> bytes:
+    """Builds a minimal single-page PDF with one line of Helvetica text per entry."""
+    escape = lambda s: s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    content = "BT /F1 10 Tf 50 780 Td 14 TL " + " ".join(f"({escape(line)}) '" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /CropBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(content)} >>\nstream\n{content}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return pdf.encode("latin-1")
+
+
+def load_corpus(pdf_dir: str, count: int, repeat: bool) -> List[bytes]:
+    if pdf_dir:
+        corpus = []
+        for path in sorted(glob.glob(os.path.join(pdf_dir, "*.pdf"))):
+            with open(path, "rb") as f:
+                corpus.append(f.read())
+        if not corpus:
+            raise SystemExit(f"No PDFs found in {pdf_dir}")
+        return corpus
+    # Distinct resumes defeat the analysis cache; repeated ones exercise it
+    variants = 5 if repeat else count
+    return [make_pdf(RESUME_LINES + [f"Reference number {i}"]) for i in range(variants)]
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+def process_rss_kb(pid) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass  # Process exited between listing and reading
+    return 0
+
+
+def current_rss_kb() -> int:
+    """RSS of this process plus the live PDF worker processes (Linux /proc)."""
+    import pdf_extraction
+
+    executor = pdf_extraction._executor
+    workers = list(getattr(executor, "_processes", None) or {}) if executor is not None else []
+    return sum(process_rss_kb(pid) for pid in ["self", *workers])
+
+
+async def sample_peak_rss(peak: List[int]) -> None:
+    while True:
+        peak[0] = max(peak[0], current_rss_kb())
+        await asyncio.sleep(RSS_SAMPLE_INTERVAL)
+
+
+async def drive(client: httpx.AsyncClient, make_request, total: int, concurrency: int) -> Dict:
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await make_request(client, i)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(1000 * (time.perf_counter() - start))
+
+    # ru_maxrss only ever grows and misses unreaped workers, so sample per endpoint instead
+    peak = [0]
+    sampler = asyncio.ensure_future(sample_peak_rss(peak)) if os.path.exists("/proc/self/status") else None
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    if sampler is not None:
+        sampler.cancel()
+        peak[0] = max(peak[0], current_rss_kb())
+    else:
+        peak[0] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "peak_rss_mb": round(peak[0] / 1024, 1),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args) -> Dict:
+    import gemini_resume_analyzer
+    import main
+    from benchmarks.linkedin_stub import app as linkedin_stub
+    from scrapers import linkedin_scraper
+
+    fake_model = FakeGeminiModel(args.gemini_latency / 1000)
+    gemini_resume_analyzer.model = fake_model
+    linkedin_scraper._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=linkedin_stub), base_url="http://linkedin-stub")
+
+    corpus = load_corpus(args.pdf_dir, args.requests, args.repeat_resumes)
+
+    async def analyze(client, i):
+        files = {"resume": (f"resume_{i}.pdf", corpus[i % len(corpus)], "application/pdf")}
+        return await client.post("/analyze_resume", files=files, data={"job_title": JOB_TITLES[i % len(JOB_TITLES)]})
+
+    async def roadmap(client, i):
+        return await client.post("/generate_roadmap", json={"field_of_interest": FIELDS[i % len(FIELDS)]})
+
+    async def job_postings(client, i):
+        return await client.post("/get_job_postings", json={
+            "job_title": JOB_TITLES[i % len(JOB_TITLES)],
+            "location": LOCATIONS[i % len(LOCATIONS)],
+            "keywords": ["python"],
+        })
+
+    endpoints = {"/analyze_resume": analyze, "/generate_roadmap": roadmap, "/get_job_postings": job_postings}
+    selected = [name for name in endpoints if not args.endpoints or name in args.endpoints]
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=120) as client:
+            for name in selected:
+                results[name] = await drive(client, endpoints[name], args.requests, args.concurrency)
+    await linkedin_scraper.close_client()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "gemini_latency_ms": args.gemini_latency,
+            "stub_latency_s": float(os.getenv("STUB_LATENCY", "0")),
+            "repeat_resumes": args.repeat_resumes,
+        },
+        "gemini_calls": fake_model.calls,
+        "endpoints": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict) -> None:
+    print(f"{'endpoint':<20} {'metric':<8} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, metrics in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "rps", "peak_rss_mb"):
+            old, new = before[metric], metrics[metric]
+            change = f"{100 * (new - old) / old:+.1f}%" if old else "n/a"
+            print(f"{name:<20} {metric:<8} {old:>10} {new:>10} {change:>8}")
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--gemini-latency", type=float, default=800, help="median fake Gemini latency (ms)")
+    parser.add_argument("--pdf-dir", default="", help="directory of sample resume PDFs")
+    parser.add_argument("--repeat-resumes", action="store_true", help="reuse a few resumes to measure cache hits")
+    parser.add_argument("--endpoints", nargs="*", help="subset of endpoints to drive")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="print a comparison against an earlier JSON report")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
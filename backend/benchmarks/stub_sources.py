@@ -0,0 +1,27 @@
+"""
+In-process job sources for exercising the multi-source runner offline:
+
+    from scrapers import register_source
+    register_source(StubSource("slowboard", jobs, delay=5.0, deadline=1.0))
+
+and add the name to JOB_SOURCES.
+"""
+import asyncio
+from typing import Dict, List, Optional
+
+from scrapers.base import JobSource
+
+
+class StubSource(JobSource):
+    def __init__(self, name: str, jobs: List[Dict], delay: float = 0.0, deadline: float = 15.0, error: Optional[str] = None):
+        self.name = name
+        self.jobs = jobs
+        self.delay = delay
+        self.deadline = deadline
+        self.error = error
+
+    async def search(self, job_title: str, location: str, keywords: List[str]) -> List[Dict]:
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise RuntimeError(self.error)
+        return [dict(job, source=self.name) for job in self.jobs]
@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# How often a worker checks the store for invalidations made by other workers;
+# this bounds how long a memory-tier entry can outlive an admin invalidation
+CACHE_SYNC_INTERVAL = float(os.getenv("CACHE_SYNC_INTERVAL", "1.0"))
+# How often expired rows are deleted from the store, checked on write
+CACHE_PURGE_INTERVAL = float(os.getenv("CACHE_PURGE_INTERVAL", "600"))
+
+
+def make_cache_key(*parts: str) -> str:
+    """Content-addressed key: sha256 over the given parts, unit-separated."""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Bounded in-process LRU with a per-entry TTL. Expired entries are dropped
+    lazily when they are looked up or pushed out by newer ones.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Returns (value, stored_at) so callers can apply their own freshness rules."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.time() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value, stored_at
+
+    def set(self, key: str, value: Any, stored_at: Optional[float] = None) -> None:
+        self._entries[key] = (stored_at if stored_at is not None else time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> bool:
+        return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteStore:
+    """
+    On-disk key/value tier. Each call opens its own connection so the file can be
+    shared by several uvicorn worker processes; WAL mode keeps readers and the
+    writer from blocking each other.
+    """
+
+    def __init__(self, path: str, table: str):
+        self.path = path
+        self.table = table
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, label TEXT, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_created_at ON {table} (created_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_invalidations (name TEXT PRIMARY KEY, invalidated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def get(self, key: str, ttl_seconds: float) -> Optional[tuple]:
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > ttl_seconds:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, label: str = "") -> None:
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, label, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, label, json.dumps(value), time.time()),
+            )
+
+    def delete(self, key: Optional[str] = None, label: Optional[str] = None) -> int:
+        with self._connect() as conn:
+            if key is not None:
+                cursor = conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            elif label is not None:
+                cursor = conn.execute(f"DELETE FROM {self.table} WHERE label = ?", (label,))
+            else:
+                cursor = conn.execute(f"DELETE FROM {self.table}")
+            return cursor.rowcount
+
+    def purge(self, ttl_seconds: float) -> int:
+        """Deletes rows older than the TTL; get() already ignores them, this just reclaims the space."""
+        with self._connect() as conn:
+            cursor = conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - ttl_seconds,))
+            return cursor.rowcount
+
+    def mark_invalidated(self) -> float:
+        """Records an invalidation so other workers drop their memory tier on their next sync."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_invalidations (name, invalidated_at) VALUES (?, ?)", (self.table, now)
+            )
+        return now
+
+    def last_invalidated(self) -> float:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT invalidated_at FROM cache_invalidations WHERE name = ?", (self.table,)
+            ).fetchone()
+        return row[0] if row is not None else 0.0
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class TieredCache:
+    """
+    LRU in front of a SQLite store. Disk operations run in a worker thread so
+    cache lookups never block the event loop. Invalidations are recorded in the
+    store, and every worker polls for them at most once per CACHE_SYNC_INTERVAL
+    so its memory tier does not keep serving entries another worker dropped.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float, db_path: Optional[str]):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(max_entries, ttl_seconds)
+        self.disk = SQLiteStore(db_path, name) if db_path else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._synced_at = 0.0
+        self._invalidated_at = 0.0
+        self._purged_at = time.monotonic()
+
+    async def _sync(self) -> None:
+        if self.disk is None or time.monotonic() - self._synced_at < CACHE_SYNC_INTERVAL:
+            return
+        self._synced_at = time.monotonic()
+        invalidated_at = await asyncio.to_thread(self.disk.last_invalidated)
+        if invalidated_at > self._invalidated_at:
+            self._invalidated_at = invalidated_at
+            self.memory.clear()
+
+    async def get(self, key: str) -> Optional[Any]:
+        await self._sync()
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+        if self.disk is not None:
+            row = await asyncio.to_thread(self.disk.get, key, self.ttl_seconds)
+            if row is not None:
+                value, stored_at = row
+                self.memory.set(key, value, stored_at)
+                self.disk_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any, label: str = "") -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value, label)
+            if time.monotonic() - self._purged_at >= CACHE_PURGE_INTERVAL:
+                self._purged_at = time.monotonic()
+                await asyncio.to_thread(self.disk.purge, self.ttl_seconds)
+
+    async def invalidate(self, key: Optional[str] = None, label: Optional[str] = None) -> int:
+        """Drops one key, every entry with the given label, or everything if neither is given."""
+        if key is not None:
+            removed = int(self.memory.delete(key))
+        else:
+            # Labels are only tracked on disk, so clear the whole memory tier
+            removed = len(self.memory)
+            self.memory.clear()
+        if self.disk is not None:
+            removed = await asyncio.to_thread(self.disk.delete, key, label)
+            self._invalidated_at = await asyncio.to_thread(self.disk.mark_invalidated)
+        return removed
+
+    async def stats(self) -> Dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "name": self.name,
+            "memory_entries": len(self.memory),
+            "memory_max_entries": self.memory.max_entries,
+            "disk_entries": await asyncio.to_thread(self.disk.count) if self.disk is not None else None,
+            "ttl_seconds": self.ttl_seconds,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one in-flight task. Waiters
+    are shielded, so a cancelled caller does not cancel the shared call.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.shared = 0
+
+    def in_flight(self, key: str) -> Optional[asyncio.Task]:
+        return self._calls.get(key)
+
+    def start(self, key: str, call: Callable[[], Awaitable]) -> asyncio.Task:
+        task = self._calls.get(key)
+        if task is not None:
+            self.shared += 1
+            return task
+        task = asyncio.ensure_future(call())
+        self._calls[key] = task
+        task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return task
+
+    async def do(self, key: str, call: Callable[[], Awaitable]) -> Any:
+        return await asyncio.shield(self.start(key, call))
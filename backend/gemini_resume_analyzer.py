@@ -1,44 +1,874 @@
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 import json  
 import re
+import asyncio
+import contextvars
+import time
+import unicodedata
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+from cache import SingleFlight, TieredCache, make_cache_key
+from llm_resilience import CircuitBreaker, HedgeStats, LatencyWindow, hedged
+from local_analyzer import analyze_resume_locally
+from metrics import (
+    errors,
+    fallbacks,
+    json_retries,
+    llm_hedges,
+    roadmap_prefetch,
+    session_analyses,
+    prompt_tokens,
+    prompt_tokens_saved,
+    record_llm_usage,
+    sections_trimmed,
+    span,
+    stage_seconds,
+)
+from resume_compaction import clean_resume_text, estimate_tokens, fit_sections, split_sections
+from resume_sessions import diff_sections, fingerprint_sections, merge_analysis, render_sections
 
 load_dotenv()
 API_KEY = os.getenv("GOOGLE_API_KEY") 
-genai.configure(api_key=API_KEY)
 
-# Initialize Gemini model
-model = genai.GenerativeModel("gemini-2.0-flash")
+# The Gemini client is created on first use (or by the startup warm-up):
+# importing google.generativeai takes a large share of cold-start time
+GEMINI_MODEL_NAME = "gemini-2.0-flash"
+model = None
 
-def analyze_resume_with_gemini(resume_text: str, job_title: str) -> dict:
-    prompt = f"""
-    Analyze the following resume for the job title: {job_title}.
 
-    Provide a detailed analysis in JSON format, considering how well the resume is tailored to this specific job title.
+def get_model():
+    global model
+    if model is None:
+        import google.generativeai as genai
 
-    The JSON object should contain the following keys:
-    - "score": An integer representing the resume score from 0 to 100, specifically for the given job title.
+        genai.configure(api_key=API_KEY)
+        model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+    return model
+
+# Bump whenever the analysis prompt changes so stale cached analyses are not reused
+ANALYSIS_PROMPT_VERSION = "2"
+
+# Concurrency limits for Gemini calls
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+GEMINI_MAX_QUEUE = int(os.getenv("GEMINI_MAX_QUEUE", "32"))
+
+
+# Resilience: per-call deadline, hedging of slow calls, malformed-JSON retries
+# and a circuit breaker that fails fast while Gemini keeps erroring
+GEMINI_DEADLINE = float(os.getenv("GEMINI_DEADLINE", "30"))
+# Token counts only tune compaction, so they get a much shorter leash than real calls
+GEMINI_TOKEN_COUNT_TIMEOUT = float(os.getenv("GEMINI_TOKEN_COUNT_TIMEOUT", "2"))
+GEMINI_HEDGING = os.getenv("GEMINI_HEDGING", "1").lower() not in ("0", "false", "no", "off")
+# A duplicate call is started once the first has run longer than this quantile
+# of recent latencies (and at least GEMINI_HEDGE_MIN_DELAY seconds)
+GEMINI_HEDGE_QUANTILE = float(os.getenv("GEMINI_HEDGE_QUANTILE", "0.95"))
+GEMINI_HEDGE_MIN_DELAY = float(os.getenv("GEMINI_HEDGE_MIN_DELAY", "2"))
+GEMINI_HEDGE_MIN_SAMPLES = 20
+GEMINI_JSON_RETRIES = int(os.getenv("GEMINI_JSON_RETRIES", "1"))
+GEMINI_BREAKER_WINDOW = int(os.getenv("GEMINI_BREAKER_WINDOW", "20"))
+GEMINI_BREAKER_MIN_CALLS = int(os.getenv("GEMINI_BREAKER_MIN_CALLS", "10"))
+GEMINI_BREAKER_ERROR_RATE = float(os.getenv("GEMINI_BREAKER_ERROR_RATE", "0.5"))
+GEMINI_BREAKER_COOLDOWN = float(os.getenv("GEMINI_BREAKER_COOLDOWN", "30"))
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when Gemini cannot serve a call right now (overload, quota, timeouts or errors)."""
+
+
+class LLMQueueFullError(LLMUnavailableError):
+    """Raised when a Gemini call is rejected because the wait queue is full."""
+
+
+class LLMQuotaExceededError(LLMUnavailableError):
+    """Raised when Gemini rejects a call because the API quota is exhausted."""
+
+
+class LLMTimeoutError(LLMUnavailableError):
+    """Raised when a Gemini call exceeds GEMINI_DEADLINE."""
+
+
+class LLMCircuitOpenError(LLMUnavailableError):
+    """Raised without calling Gemini while the circuit breaker is open."""
+
+
+class LLMBadResponseError(LLMUnavailableError):
+    """Raised when Gemini keeps returning empty or malformed JSON."""
+
+
+class LLMCallFailedError(LLMUnavailableError):
+    """Raised when the Gemini API call itself fails."""
+
+
+def is_quota_error(error: Exception) -> bool:
+    from google.api_core import exceptions as google_exceptions
+
+    return isinstance(error, google_exceptions.ResourceExhausted)
+
+
+# Set inside speculative work (e.g. roadmap prefetch): such calls never wait for a slot
+low_priority = contextvars.ContextVar("llm_low_priority", default=False)
+
+
+class LLMPool:
+    """
+    Bounded pool for async Gemini calls. At most `max_concurrency` calls run at
+    once; up to `max_queue` more may wait for a slot before new calls are rejected.
+    Low-priority calls are rejected instead of waiting, so they never delay
+    user-facing ones.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rejected_low_priority = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+
+    @property
+    def saturated(self) -> bool:
+        return self.in_flight >= self.max_concurrency
+
+    @asynccontextmanager
+    async def slot(self):
+        """Holds one concurrency slot for the duration of the block (e.g. a streamed call)."""
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise LLMQueueFullError(
+                f"Gemini queue is full ({self.queued} waiting, {self.in_flight} in flight)."
+            )
+        if low_priority.get() and (self.saturated or self.queued):
+            self.rejected_low_priority += 1
+            raise LLMQueueFullError("Gemini pool is busy; skipping low-priority call.")
+
+        self.queued += 1
+        wait_start = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        wait = time.perf_counter() - wait_start
+        self.total_queue_wait += wait
+        self.max_queue_wait = max(self.max_queue_wait, wait)
+        stage_seconds.observe(wait, stage="llm_queue_wait")
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rejected_low_priority": self.rejected_low_priority,
+            "avg_queue_wait_ms": round(1000 * self.total_queue_wait / self.completed, 2) if self.completed else 0.0,
+            "max_queue_wait_ms": round(1000 * self.max_queue_wait, 2),
+        }
+
+
+llm_pool = LLMPool(GEMINI_MAX_CONCURRENCY, GEMINI_MAX_QUEUE)
+
+
+# One window per call type: a roadmap and an analysis take very different times
+gemini_latency: Dict[str, LatencyWindow] = {}
+hedge_stats = HedgeStats()
+gemini_breaker = CircuitBreaker(
+    GEMINI_BREAKER_WINDOW, GEMINI_BREAKER_MIN_CALLS, GEMINI_BREAKER_ERROR_RATE, GEMINI_BREAKER_COOLDOWN
+)
+
+
+def latency_window(call: str) -> LatencyWindow:
+    return gemini_latency.setdefault(call, LatencyWindow(200))
+
+
+def hedge_delay(call: str) -> float:
+    """Seconds to wait before hedging a call; 0 (no hedge) until enough of its latencies have been seen."""
+    window = latency_window(call)
+    if not GEMINI_HEDGING or len(window) < GEMINI_HEDGE_MIN_SAMPLES:
+        return 0.0
+    return max(GEMINI_HEDGE_MIN_DELAY, window.quantile(GEMINI_HEDGE_QUANTILE))
+
+
+@asynccontextmanager
+async def breaker_guard():
+    """Fails fast while the breaker is open and records the outcome of the guarded call."""
+    if not gemini_breaker.allow():
+        raise LLMCircuitOpenError("Gemini is failing repeatedly; calls are paused for a cooldown.")
+    outcome = None
+    try:
+        yield
+        outcome = True
+    except LLMQueueFullError:
+        raise  # Local overload says nothing about Gemini's health
+    except asyncio.TimeoutError as e:
+        outcome = False
+        raise LLMTimeoutError(f"Gemini did not answer within {GEMINI_DEADLINE}s.") from e
+    except Exception:
+        outcome = False
+        raise
+    finally:
+        if outcome is None:
+            gemini_breaker.abandon()
+        else:
+            gemini_breaker.record(outcome)
+
+
+async def _generate_once(prompt: str, call: str):
+    async with llm_pool.slot():
+        started = time.perf_counter()
+        response = await asyncio.wait_for(get_model().generate_content_async([prompt]), GEMINI_DEADLINE)
+        latency_window(call).record(time.perf_counter() - started)
+        return response
+
+
+async def generate_content(prompt: str, call: str):
+    """
+    Runs one Gemini generation through the shared pool without blocking the
+    event loop, under the circuit breaker and per-call deadline. A slow call is
+    hedged with a duplicate once it passes the recent p95 latency of the same
+    call type, unless the pool is already saturated.
+    """
+    async with breaker_guard():
+        response, winner = await hedged(
+            lambda: _generate_once(prompt, call), hedge_delay(call), lambda: not llm_pool.saturated, hedge_stats
+        )
+    if winner != "unhedged":
+        llm_hedges.inc(winner=winner)
+    return response
+
+
+async def stream_content(prompt: str) -> AsyncIterator[str]:
+    """
+    Streams response text under the pool, breaker and deadline. Streams are not
+    hedged: their partial output has already been shown to the client.
+    """
+    async with breaker_guard(), llm_pool.slot():
+        started = time.perf_counter()
+        deadline = started + GEMINI_DEADLINE
+        response = await asyncio.wait_for(get_model().generate_content_async([prompt], stream=True), GEMINI_DEADLINE)
+        chunks = response.__aiter__()
+        first_chunk = True
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), deadline - time.perf_counter())
+            except StopAsyncIteration:
+                break
+            if first_chunk:
+                first_chunk = False
+                stage_seconds.observe(time.perf_counter() - started, stage="gemini_first_chunk")
+            try:
+                text = chunk.text
+            except ValueError:
+                continue  # Chunk without text parts (e.g. safety metadata)
+            yield text
+        stage_seconds.observe(time.perf_counter() - started, stage="gemini_analysis_stream")
+        record_llm_usage("analysis", response)
+
+
+def parse_json_text(raw_text: str, required=()) -> dict:
+    """Parses a JSON object out of a model reply, ignoring Markdown code fences."""
+    json_string = re.sub(r'```json\n?', '', raw_text.strip())
+    json_string = re.sub(r'```', '', json_string).strip()
+    data = json.loads(json_string)
+    if not isinstance(data, dict) or any(field not in data for field in required):
+        raise ValueError(f"Expected a JSON object with {', '.join(required) or 'fields'}.")
+    return data
+
+
+def response_text(response) -> str:
+    try:
+        return response.parts[0].text if response.parts else ""
+    except (AttributeError, ValueError):
+        return ""
+
+
+async def generate_json(prompt: str, call: str, required=()) -> dict:
+    """
+    Generates and parses a JSON reply, repeating the call up to
+    GEMINI_JSON_RETRIES times when the reply is empty or malformed.
+    """
+    for attempt in range(GEMINI_JSON_RETRIES + 1):
+        if attempt:
+            json_retries.inc(call=call)
+        with span(f"gemini_{call}"):
+            response = await generate_content(prompt, call)
+        record_llm_usage(call, response)
+        raw_text = response_text(response)
+        try:
+            with span("json_parse"):
+                return parse_json_text(raw_text, required)
+        except ValueError as e:  # json.JSONDecodeError is a ValueError
+            print(f"JSON Decode Error in {call} response (attempt {attempt + 1}): {e}")
+            print(f"Raw Gemini Response: {raw_text}")
+    raise LLMBadResponseError(f"Gemini returned no valid JSON for the {call} after {GEMINI_JSON_RETRIES + 1} attempts.")
+
+
+def as_unavailable(error: Exception) -> LLMUnavailableError:
+    if isinstance(error, LLMUnavailableError):
+        return error
+    if is_quota_error(error):
+        return LLMQuotaExceededError(str(error))
+    return LLMCallFailedError(f"An error occurred while calling the Gemini API: {error}")
+
+
+def fallback_reason(error: LLMUnavailableError) -> str:
+    reasons = {
+        LLMQuotaExceededError: "llm_quota",
+        LLMTimeoutError: "llm_timeout",
+        LLMCircuitOpenError: "circuit_open",
+        LLMBadResponseError: "invalid_json",
+        LLMCallFailedError: "gemini_error",
+    }
+    return reasons.get(type(error), "llm_unavailable")
+
+
+def get_llm_pool_stats() -> Dict:
+    return {
+        **llm_pool.stats(),
+        "breaker": gemini_breaker.stats(),
+        "hedging": {
+            **hedge_stats.to_dict(),
+            "enabled": GEMINI_HEDGING,
+            "delay_s": {call: round(hedge_delay(call), 3) for call in gemini_latency},
+            "p95_latency_s": {call: round(window.quantile(0.95), 3) for call, window in gemini_latency.items()},
+        },
+    }
+
+
+# "off": always call Gemini; "auto": serve the local analysis when Gemini is
+# overloaded or out of quota; "always": never call Gemini for analyses
+ANALYSIS_FAST_MODE = os.getenv("ANALYSIS_FAST_MODE", "auto").lower()
+
+
+# Resume compaction: cleanup plus trimming to a token budget by section priority
+RESUME_COMPACTION = os.getenv("RESUME_COMPACTION", "1").lower() not in ("0", "false", "no", "off")
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "2500"))
+# "model" measures with Gemini's token counter; "estimate" uses a characters-per-token ratio
+RESUME_TOKEN_COUNTER = os.getenv("RESUME_TOKEN_COUNTER", "model").lower()
+# The model counter is only consulted when the estimate is within this fraction of the budget
+RESUME_TOKEN_COUNT_MARGIN = float(os.getenv("RESUME_TOKEN_COUNT_MARGIN", "0.25"))
+
+
+# Analysis cache: in-process LRU backed by a SQLite file shared across workers
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "512"))
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600)))
+ANALYSIS_CACHE_DB = os.getenv(
+    "ANALYSIS_CACHE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache.sqlite3")
+)
+
+analysis_cache = TieredCache("analysis", ANALYSIS_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_TTL, ANALYSIS_CACHE_DB or None)
+
+# Incremental re-analysis: per-session section fingerprints, summaries and the last result
+ANALYSIS_SESSION_MAX_ENTRIES = int(os.getenv("ANALYSIS_SESSION_MAX_ENTRIES", "1024"))
+ANALYSIS_SESSION_TTL = float(os.getenv("ANALYSIS_SESSION_TTL", str(24 * 3600)))
+# Above this share of changed text the whole resume is re-analyzed instead of the diff
+INCREMENTAL_MAX_CHANGED_RATIO = float(os.getenv("INCREMENTAL_MAX_CHANGED_RATIO", "0.6"))
+
+analysis_sessions = TieredCache(
+    "analysis_sessions", ANALYSIS_SESSION_MAX_ENTRIES, ANALYSIS_SESSION_TTL, ANALYSIS_CACHE_DB or None
+)
+
+
+def normalize_resume_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def normalize_job_title(job_title: str) -> str:
+    return " ".join(job_title.lower().split())
+
+
+def analysis_cache_key(resume_text: str, job_title: str) -> str:
+    return make_cache_key(
+        normalize_resume_text(resume_text),
+        normalize_job_title(job_title),
+        GEMINI_MODEL_NAME,
+        ANALYSIS_PROMPT_VERSION,
+        str(RESUME_TOKEN_BUDGET if RESUME_COMPACTION else 0),
+    )
+
+
+async def count_tokens(text: str) -> int:
+    """
+    Estimates the token count locally, and asks the model's counter only when
+    the estimate is too close to RESUME_TOKEN_BUDGET to decide on trimming.
+    """
+    estimate = estimate_tokens(text)
+    if RESUME_TOKEN_COUNTER != "model" or abs(estimate - RESUME_TOKEN_BUDGET) > RESUME_TOKEN_COUNT_MARGIN * RESUME_TOKEN_BUDGET:
+        return estimate
+    # While the breaker is not closed, don't delay the fail-fast (or the probe) with a side call
+    if gemini_breaker.state != CircuitBreaker.CLOSED:
+        return estimate
+    try:
+        with span("token_count"):
+            response = await asyncio.wait_for(get_model().count_tokens_async([text]), GEMINI_TOKEN_COUNT_TIMEOUT)
+        return response.total_tokens
+    except asyncio.TimeoutError:
+        print(f"Token count took over {GEMINI_TOKEN_COUNT_TIMEOUT}s, estimating instead.")
+    except Exception as e:
+        print(f"Token count failed, estimating instead: {e}")
+    return estimate
+
+
+async def compact_resume_for_prompt(resume_text: str) -> str:
+    """
+    Cleans the resume text and fits it to RESUME_TOKEN_BUDGET. Near the budget
+    the cleaned text is measured with the model's token counter; when trimming
+    is needed, section sizes are estimated with the characters-per-token ratio
+    that gives. The original size is only estimated, for the savings metric.
+    """
+    if not RESUME_COMPACTION:
+        return resume_text
+    with span("resume_compaction"):
+        cleaned = clean_resume_text(resume_text)
+    original_tokens = estimate_tokens(resume_text)
+    compacted_tokens = await count_tokens(cleaned)
+
+    compacted = cleaned
+    if compacted_tokens > RESUME_TOKEN_BUDGET:
+        chars_per_token = len(cleaned) / compacted_tokens
+        with span("resume_compaction"):
+            compacted, trimmed = fit_sections(split_sections(cleaned), RESUME_TOKEN_BUDGET, chars_per_token)
+        compacted_tokens = estimate_tokens(compacted, chars_per_token)
+        for section in trimmed:
+            sections_trimmed.inc(section=section)
+
+    prompt_tokens.observe(original_tokens, stage="original")
+    prompt_tokens.observe(compacted_tokens, stage="compacted")
+    prompt_tokens_saved.inc(max(0, original_tokens - compacted_tokens))
+    return compacted
+
+
+async def analyze_resume_cached(resume_text: str, job_title: str, fast: bool = False) -> Tuple[dict, bool]:
+    """
+    Returns (analysis, cache_hit). Only complete Gemini analyses are cached.
+    Keywords always come from the local analyzer; with `fast` (or when Gemini
+    is unavailable, slow or failing in "auto" mode) the local analysis is
+    returned instead.
+    """
+    with span("local_analysis"):
+        local = analyze_resume_locally(resume_text, job_title)
+    if fast or ANALYSIS_FAST_MODE == "always":
+        return local, False
+
+    key = analysis_cache_key(resume_text, job_title)
+    with span("analysis_cache_get"):
+        cached = await analysis_cache.get(key)
+    if cached is not None:
+        return dict(cached, keywords=local["keywords"]), True
+
+    try:
+        result = await analyze_resume_with_gemini(resume_text, job_title)
+    except LLMUnavailableError as e:
+        if ANALYSIS_FAST_MODE == "auto":
+            print(f"Gemini unavailable, serving fast-mode analysis: {e}")
+            fallbacks.inc(reason=fallback_reason(e))
+            return local, False
+        raise
+    if "detailed_analysis" in result:
+        await analysis_cache.set(key, result, label=normalize_job_title(job_title))
+    return dict(result, keywords=local["keywords"]), False
+
+
+async def invalidate_analysis_cache(key: Optional[str] = None, job_title: Optional[str] = None) -> int:
+    return await analysis_cache.invalidate(key, normalize_job_title(job_title) if job_title else None)
+
+
+# Top-level analysis fields streamed to clients as soon as they can be parsed
+STREAMED_FIELDS = ("score", "suggestions", "field_of_interest")
+# Replies missing these are treated as malformed
+ANALYSIS_REQUIRED_FIELDS = ("score", "suggestions", "field_of_interest")
+_json_decoder = json.JSONDecoder()
+
+
+def parse_partial_fields(text: str, skip=()) -> dict:
+    """
+    Pulls complete top-level values out of a JSON document that is still being
+    generated. A value counts as complete once it decodes and more text follows
+    it, so a number like 6 is not reported while 68 is still arriving.
+    """
+    found = {}
+    for field in STREAMED_FIELDS:
+        if field in skip:
+            continue
+        match = re.search(rf'"{field}"\s*:\s*', text)
+        if not match:
+            continue
+        try:
+            value, end = _json_decoder.raw_decode(text, match.end())
+        except json.JSONDecodeError:
+            continue
+        if end < len(text):
+            found[field] = value
+    return found
+
+
+async def stream_analysis_with_gemini(resume_text: str, job_title: str, fast: bool = False) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Streams an analysis as ("partial", fields) events while Gemini generates,
+    followed by one ("result", analysis) event with the same shape that
+    analyze_resume_cached returns. The first partial event carries the local
+    provisional score and keywords.
+    """
+    with span("local_analysis"):
+        local = analyze_resume_locally(resume_text, job_title)
+    if fast or ANALYSIS_FAST_MODE == "always":
+        yield "result", local
+        return
+    yield "partial", {"provisional_score": local["score"], "keywords": local["keywords"]}
+
+    key = analysis_cache_key(resume_text, job_title)
+    with span("analysis_cache_get"):
+        cached = await analysis_cache.get(key)
+    if cached is not None:
+        yield "result", dict(cached, keywords=local["keywords"])
+        return
+
+    compacted = await compact_resume_for_prompt(resume_text)
+    with span("prompt_build"):
+        prompt = build_analysis_prompt(compacted, job_title)
+    try:
+        async for event, payload in stream_analysis_json(prompt):
+            if event == "partial":
+                yield event, payload
+            else:
+                result = payload
+    except Exception as e:
+        analysis_failed(e, "gemini_analysis_stream")
+        yield "result", local
+        return
+
+    if "detailed_analysis" in result:
+        await analysis_cache.set(key, result, label=normalize_job_title(job_title))
+    yield "result", dict(result, keywords=local["keywords"])
+
+
+async def stream_analysis_json(prompt: str) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Streams an analysis prompt as ("partial", fields) events followed by one
+    ("reply", parsed JSON) event. A malformed reply is retried without streaming.
+    """
+    raw_text = ""
+    emitted = set()
+    async for text in stream_content(prompt):
+        raw_text += text
+        partial = parse_partial_fields(raw_text, emitted)
+        if partial:
+            emitted.update(partial)
+            yield "partial", partial
+    try:
+        with span("json_parse"):
+            result = parse_json_text(raw_text, ANALYSIS_REQUIRED_FIELDS)
+    except ValueError as e:
+        print(f"JSON Decode Error in streamed analysis: {e}")
+        if not GEMINI_JSON_RETRIES:
+            raise LLMBadResponseError(f"Gemini returned no valid JSON for the analysis: {e}")
+        json_retries.inc(call="analysis")
+        result = await generate_json(prompt, "analysis", ANALYSIS_REQUIRED_FIELDS)
+    yield "reply", result
+
+
+def analysis_failed(error: Exception, stage: str) -> None:
+    """
+    Handles a failed streamed analysis: raises it as an LLMUnavailableError,
+    unless "auto" mode lets the caller serve the local analysis instead.
+    """
+    if not isinstance(error, LLMUnavailableError):
+        print(f"Gemini API Error in {stage}: {error}")
+        errors.inc(stage=stage)
+    error = as_unavailable(error)
+    if ANALYSIS_FAST_MODE != "auto":
+        raise error
+    print(f"Gemini unavailable, serving fast-mode analysis: {error}")
+    fallbacks.inc(reason=fallback_reason(error))
+
+
+def session_cache_key(session_id: str, job_title: str) -> str:
+    return make_cache_key(session_id, normalize_job_title(job_title), GEMINI_MODEL_NAME, ANALYSIS_PROMPT_VERSION)
+
+
+async def _session_analysis_events(
+    resume_text: str, job_title: str, session_id: str, fast: bool
+) -> AsyncIterator[Tuple[str, dict]]:
+    """stream_session_analysis, plus a ("cache_hit", {}) event before results served without a model call."""
+    with span("local_analysis"):
+        local = analyze_resume_locally(resume_text, job_title)
+    if fast or ANALYSIS_FAST_MODE == "always":
+        yield "result", local
+        return
+    yield "partial", {"provisional_score": local["score"], "keywords": local["keywords"]}
+
+    key = session_cache_key(session_id, job_title)
+    with span("resume_sections"):
+        sections = fingerprint_sections(resume_text)
+    with span("analysis_cache_get"):
+        session = await analysis_sessions.get(key)
+    diff = diff_sections(session, sections) if session is not None else None
+    if diff is not None and not diff.changed and not diff.removed:
+        session_analyses.inc(mode="unchanged")
+        yield "cache_hit", {}
+        yield "result", dict(session["result"], keywords=local["keywords"])
+        return
+
+    def session_state(result: dict, summaries: Dict[str, str]) -> dict:
+        return {
+            "fingerprints": {section.name: section.fingerprint for section in sections},
+            "summaries": summaries,
+            "result": result,
+        }
+
+    # Summaries of sections that did not change stay valid whatever happens to the rest
+    kept = {s.name: session["summaries"][s.name] for s in diff.unchanged} if diff is not None else {}
+    incremental = diff is not None and diff.changed_ratio <= INCREMENTAL_MAX_CHANGED_RATIO
+    if not incremental:
+        # The same text may have been analyzed before (another session, or an earlier job title)
+        cache_key = analysis_cache_key(resume_text, job_title)
+        with span("analysis_cache_get"):
+            cached = await analysis_cache.get(cache_key)
+        if cached is not None:
+            session_analyses.inc(mode="cached")
+            await analysis_sessions.set(key, session_state(cached, kept))
+            yield "cache_hit", {}
+            yield "result", dict(cached, keywords=local["keywords"])
+            return
+
+    budget = RESUME_TOKEN_BUDGET if RESUME_COMPACTION else None
+    with span("prompt_build"):
+        if incremental:
+            resume_part = render_sections(diff.changed, budget)
+            prompt = build_incremental_analysis_prompt(session["result"], resume_part, kept, diff.removed, job_title)
+        else:
+            resume_part = render_sections(sections, budget)
+            prompt = build_sectioned_analysis_prompt(resume_part, job_title)
+    mode = "incremental" if incremental else "full"
+    prompt_tokens.observe(estimate_tokens(resume_part), stage=mode)
+    try:
+        async for event, payload in stream_analysis_json(prompt):
+            if event == "partial":
+                yield event, payload
+            else:
+                reply = payload
+    except Exception as e:
+        analysis_failed(e, "gemini_session_analysis")
+        yield "result", local
+        return
+    session_analyses.inc(mode=mode)
+
+    summaries = reply.pop("section_summaries", None)
+    summaries = summaries if isinstance(summaries, dict) else {}
+    result = merge_analysis(session["result"], reply) if incremental else reply
+    if "detailed_analysis" in result:
+        # Sections the model did not summarize count as changed on the next upload
+        names = {section.name for section in sections}
+        kept.update({name: str(summary) for name, summary in summaries.items() if name in names})
+        await analysis_sessions.set(key, session_state(result, kept))
+        if not incremental:
+            # A full analysis is as good as a plain one, so share it with the content-addressed cache
+            await analysis_cache.set(cache_key, result, label=normalize_job_title(job_title))
+    yield "result", dict(result, keywords=local["keywords"])
+
+
+async def stream_session_analysis(
+    resume_text: str, job_title: str, session_id: str, fast: bool = False
+) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Session-aware variant of stream_analysis_with_gemini for the edit-and-resubmit
+    loop, with the same events. The first upload in a session is analyzed in
+    full along with a summary per section (or served from the analysis cache);
+    later uploads send only the changed sections plus the stored summaries of
+    the others, and the reply is merged into the previous analysis. An
+    unchanged resume returns the stored result.
+    """
+    async for event, payload in _session_analysis_events(resume_text, job_title, session_id, fast):
+        if event != "cache_hit":
+            yield event, payload
+
+
+async def analyze_resume_in_session(
+    resume_text: str, job_title: str, session_id: str, fast: bool = False
+) -> Tuple[dict, bool]:
+    """Non-streaming form of stream_session_analysis. Returns (analysis, cache_hit)."""
+    result, cache_hit = None, False
+    async for event, payload in _session_analysis_events(resume_text, job_title, session_id, fast):
+        if event == "cache_hit":
+            cache_hit = True
+        elif event == "result":
+            result = payload
+    return result, cache_hit
+
+
+# Roadmap cache: roadmaps depend only on the (canonicalized) field of interest
+ROADMAP_PROMPT_VERSION = "1"
+ROADMAP_CACHE_MAX_ENTRIES = int(os.getenv("ROADMAP_CACHE_MAX_ENTRIES", "256"))
+ROADMAP_CACHE_TTL = float(os.getenv("ROADMAP_CACHE_TTL", str(30 * 24 * 3600)))
+ROADMAP_WARMUP_FIELDS = [f.strip() for f in os.getenv("ROADMAP_WARMUP_FIELDS", "").split(",") if f.strip()]
+# Start generating the roadmap for an analysis' field of interest before the user asks for it
+ROADMAP_PREFETCH = os.getenv("ROADMAP_PREFETCH", "1").lower() not in ("0", "false", "no", "off")
+
+# Maps common spellings and abbreviations onto one canonical field name
+FIELD_ALIASES = {
+    "swe": "software engineering",
+    "software engineer": "software engineering",
+    "software development": "software engineering",
+    "software developer": "software engineering",
+    "ds": "data science",
+    "data scientist": "data science",
+    "ml": "machine learning",
+    "machine learning engineering": "machine learning",
+    "ai/ml": "machine learning",
+    "ai": "artificial intelligence",
+    "web dev": "web development",
+    "web developer": "web development",
+    "frontend": "frontend development",
+    "front-end development": "frontend development",
+    "backend": "backend development",
+    "back-end development": "backend development",
+    "devops engineering": "devops",
+    "cyber security": "cybersecurity",
+    "information security": "cybersecurity",
+    "data analyst": "data analytics",
+    "data analysis": "data analytics",
+    "ui/ux": "ux design",
+    "ui/ux design": "ux design",
+    "product manager": "product management",
+    "cloud": "cloud computing",
+}
+
+roadmap_cache = TieredCache("roadmap", ROADMAP_CACHE_MAX_ENTRIES, ROADMAP_CACHE_TTL, ANALYSIS_CACHE_DB or None)
+roadmap_flights = SingleFlight()
+roadmap_prefetches = SingleFlight()
+
+
+def canonical_field(field_of_interest: str) -> str:
+    field = " ".join(field_of_interest.lower().replace("_", " ").split())
+    return FIELD_ALIASES.get(field, field)
+
+
+def roadmap_cache_key(field_of_interest: str) -> str:
+    return make_cache_key(canonical_field(field_of_interest), GEMINI_MODEL_NAME, ROADMAP_PROMPT_VERSION)
+
+
+async def _generate_and_cache_roadmap(key: str, field: str) -> dict:
+    roadmap_data = await generate_roadmap_with_gemini(field)
+    if "error" not in roadmap_data:
+        await roadmap_cache.set(key, roadmap_data, label=field)
+    return roadmap_data
+
+
+async def get_roadmap_cached(field_of_interest: str) -> Tuple[dict, bool]:
+    """
+    Returns (roadmap, cache_hit). Concurrent misses for the same canonical field
+    share a single Gemini call, and a miss joins a prefetch already in flight
+    (falling back to its own call if the prefetch fails or was skipped).
+    """
+    key = roadmap_cache_key(field_of_interest)
+    cached = await roadmap_cache.get(key)
+    if cached is not None:
+        return cached, True
+    prefetch = roadmap_prefetches.in_flight(key)
+    if prefetch is not None:
+        roadmap_prefetch.inc(result="joined")
+        try:
+            return await asyncio.shield(prefetch), False
+        except LLMUnavailableError:
+            pass
+    field = canonical_field(field_of_interest)
+    return await roadmap_flights.do(key, lambda: _generate_and_cache_roadmap(key, field)), False
+
+
+async def _prefetch_roadmap(key: str, field: str) -> dict:
+    cached = await roadmap_cache.get(key)
+    if cached is not None:
+        return cached
+    low_priority.set(True)  # Scoped to this prefetch task's own context
+    return await _generate_and_cache_roadmap(key, field)
+
+
+def _log_prefetch_result(task: asyncio.Task) -> None:
+    if task.cancelled():
+        return
+    error = task.exception()
+    if isinstance(error, LLMQueueFullError):
+        roadmap_prefetch.inc(result="skipped")
+    elif error is not None:
+        print(f"Roadmap prefetch failed: {error}")
+        roadmap_prefetch.inc(result="failed")
+
+
+def prefetch_roadmap(analysis: Dict) -> bool:
+    """
+    Starts generating the roadmap for the analysis' field of interest in the
+    background (once per field at a time) so a following /generate_roadmap is
+    served from cache or joins it. Skipped when disabled, when the Gemini pool
+    is busy, and for fast-mode analyses: their callers opted out of Gemini, or
+    it was unavailable.
+    """
+    field_of_interest = analysis.get("field_of_interest")
+    if not ROADMAP_PREFETCH or not field_of_interest or field_of_interest in ("Unknown", "Error"):
+        return False
+    if ANALYSIS_FAST_MODE == "always" or analysis.get("mode") == "fast":
+        return False
+    if llm_pool.saturated or llm_pool.queued or gemini_breaker.state != gemini_breaker.CLOSED:
+        roadmap_prefetch.inc(result="skipped")
+        return False
+    key = roadmap_cache_key(field_of_interest)
+    if roadmap_prefetches.in_flight(key) or roadmap_flights.in_flight(key):
+        return False
+    task = roadmap_prefetches.start(key, lambda: _prefetch_roadmap(key, canonical_field(field_of_interest)))
+    task.add_done_callback(_log_prefetch_result)
+    roadmap_prefetch.inc(result="started")
+    return True
+
+
+async def warm_roadmap_cache(fields=None) -> None:
+    """Pre-generates roadmaps for popular fields so first requests are served from cache."""
+    fields = ROADMAP_WARMUP_FIELDS if fields is None else fields
+    results = await asyncio.gather(*(get_roadmap_cached(f) for f in fields), return_exceptions=True)
+    for field, result in zip(fields, results):
+        if isinstance(result, Exception):
+            print(f"Roadmap warm-up failed for {field}: {result}")
+
+
+# Shared by the full, sectioned and incremental analysis prompts
+ANALYSIS_KEYS = """    - "score": An integer representing the resume score from 0 to 100, specifically for the given job title.
     - "suggestions": A list of three specific and actionable suggestions for improvement, tailored to the job title.
     - "field_of_interest": A string representing the candidate's primary field of interest inferred from the resume content.
     - "detailed_analysis": A dictionary with the following keys:
         - "overall_assessment": A string providing an overall assessment of the resume's suitability for the job title.
         - "strengths": A list of strings highlighting the resume's strengths in relation to the job title.
         - "weaknesses": A list of strings pointing out the resume's weaknesses in relation to the job title.
-        - "reasoning_for_field": A string explaining the reasoning behind the inferred field of interest.
+        - "reasoning_for_field": A string explaining the reasoning behind the inferred field of interest."""
+ANALYSIS_EXAMPLE = (
+    '{"score": 68, "suggestions": ["...", "...", "..."], "field_of_interest": "Software Engineering", '
+    '"detailed_analysis": {"overall_assessment": "...", "strengths": ["..."], "weaknesses": ["..."], "reasoning_for_field": "..."}}'
+)
+SECTIONED_ANALYSIS_EXAMPLE = ANALYSIS_EXAMPLE[:-1] + ', "section_summaries": {"experience": "...", "skills": "..."}}'
+SECTION_SUMMARIES_KEY = """    - "section_summaries": A dictionary mapping each bracketed section label (e.g. "experience") to one or two sentences summarizing that section's content and how well it supports the job title."""
+
+
+def build_analysis_prompt(resume_text: str, job_title: str) -> str:
+    return f"""
+    Analyze the following resume for the job title: {job_title}.
+
+    Provide a detailed analysis in JSON format, considering how well the resume is tailored to this specific job title.
+
+    The JSON object should contain the following keys:
+{ANALYSIS_KEYS}
 
     Example JSON response:
-    {{
-      "score": 68,
-      "suggestions": ["Highlight project experience relevant to {job_title}.", "Quantify achievements with metrics related to {job_title}.", "Customize the skills section for {job_title}."],
-      "field_of_interest": "Software Engineering",
-      "detailed_analysis": {{
-        "overall_assessment": "The resume shows some potential for a {job_title} role, but needs better tailoring.",
-        "strengths": ["Strong technical skills are mentioned.", "Education is relevant to {job_title}."],
-        "weaknesses": ["Lack of specific {job_title} experience is evident.", "Achievements are not quantified in a {job_title} context.", "Resume is generic, not targeted."],
-        "reasoning_for_field": "The resume emphasizes programming skills and software development projects."
-      }}
-    }}
+    {ANALYSIS_EXAMPLE}
 
     Resume:
     \"\"\"
@@ -48,43 +878,74 @@ def analyze_resume_with_gemini(resume_text: str, job_title: str) -> dict:
     Respond ONLY with the JSON object. Do not include any other text or explanations, including Markdown code blocks.
     """
 
-    try:
-        response = model.generate_content([prompt])
-        if response.parts and hasattr(response.parts[0], "text"):
-            raw_text = response.parts[0].text.strip()  # Remove leading/trailing whitespace
-            # Remove Markdown code block markers if present
-            json_string = re.sub(r'```json\n?', '', raw_text)
-            json_string = re.sub(r'```', '', json_string).strip()
 
-            try:
-                # Attempt to load the JSON response
-                json_output = json.loads(json_string)
-                return json_output
-            except json.JSONDecodeError as e:
-                print(f"JSON Decode Error: {e}")
-                print(f"Raw Gemini Response: {raw_text}")
-                print(f"Processed JSON String: {json_string}")
-                return {
-                    "score": 50,
-                    "suggestions": ["Gemini's response was not in the expected JSON format."],
-                    "field_of_interest": "Unknown"
-                }
-        else:
-            return {
-                "score": 50,
-                "suggestions": ["No response text received from Gemini."],
-                "field_of_interest": "Unknown"
-            }
+def build_sectioned_analysis_prompt(sections_text: str, job_title: str) -> str:
+    return f"""
+    Analyze the following resume for the job title: {job_title}.
+
+    Provide a detailed analysis in JSON format, considering how well the resume is tailored to this specific job title.
+    The resume is split into sections, each introduced by a bracketed label such as [experience].
+
+    The JSON object should contain the following keys:
+{ANALYSIS_KEYS}
+{SECTION_SUMMARIES_KEY}
+
+    Example JSON response:
+    {SECTIONED_ANALYSIS_EXAMPLE}
+
+    Resume:
+    \"\"\"
+    {sections_text}
+    \"\"\"
+
+    Respond ONLY with the JSON object. Do not include any other text or explanations, including Markdown code blocks.
+    """
+
+
+def build_incremental_analysis_prompt(
+    previous: dict, changed_text: str, summaries: Dict[str, str], removed, job_title: str
+) -> str:
+    unchanged = "\n".join(f"    [{name}]: {summary}" for name, summary in summaries.items()) or "    (none)"
+    return f"""
+    You previously analyzed a resume for the job title: {job_title}. The candidate has since edited it.
+
+    Your previous analysis:
+    {json.dumps(previous)}
+
+    Sections that did not change, with your earlier summaries:
+{unchanged}
+
+    Sections that were removed: {", ".join(removed) or "none"}
+
+    Sections that were added or edited, in full:
+    \"\"\"
+    {changed_text}
+    \"\"\"
+
+    Update the analysis to reflect the edited resume as a whole, not just the edits. Respond with a JSON object containing the following keys:
+{ANALYSIS_KEYS}
+{SECTION_SUMMARIES_KEY} Include only the added or edited sections.
+
+    Respond ONLY with the JSON object. Do not include any other text or explanations, including Markdown code blocks.
+    """
+
+
+async def analyze_resume_with_gemini(resume_text: str, job_title: str) -> dict:
+    """Raises an LLMUnavailableError subclass when no valid analysis can be produced."""
+    compacted = await compact_resume_for_prompt(resume_text)
+    with span("prompt_build"):
+        prompt = build_analysis_prompt(compacted, job_title)
+
+    try:
+        return await generate_json(prompt, "analysis", ANALYSIS_REQUIRED_FIELDS)
     except Exception as e:
-        print(f"Gemini API Error: {e}")
-        return {
-            "score": 30,
-            "suggestions": [f"An error occurred while calling the Gemini API: {e}"],
-            "field_of_interest": "Error"
-        }
-    
+        if not isinstance(e, LLMUnavailableError):
+            print(f"Gemini API Error: {e}")
+        raise as_unavailable(e) from e
+
+
 # For roadmap
-def generate_roadmap_with_gemini(field_of_interest: str) -> dict:
+async def generate_roadmap_with_gemini(field_of_interest: str) -> dict:
     """
     Generates a roadmap of tutorials, certifications, and projects for a given field
     of interest using the Gemini model.
@@ -136,22 +997,8 @@ def generate_roadmap_with_gemini(field_of_interest: str) -> dict:
     """
 
     try:
-        response = model.generate_content([prompt])
-        if response.parts and hasattr(response.parts[0], "text"):
-            raw_text = response.parts[0].text.strip()
-            json_string = re.sub(r'```json\n?', '', raw_text)
-            json_string = re.sub(r'```', '', json_string).strip()
-
-            try:
-                roadmap_data = json.loads(json_string)
-                return roadmap_data
-            except json.JSONDecodeError as e:
-                print(f"JSON Decode Error in generate_roadmap_with_gemini: {e}")
-                print(f"Raw Gemini Response: {raw_text}")
-                print(f"Processed JSON String: {json_string}")
-                return {"error": "Invalid JSON response from Gemini for roadmap."}
-        else:
-            return {"error": "No response text received from Gemini for roadmap."}
+        return await generate_json(prompt, "roadmap", ("tutorials", "certifications", "projects"))
     except Exception as e:
-        print(f"Gemini API Error in generate_roadmap_with_gemini: {e}")
-        return {"error": f"An error occurred while calling the Gemini API for roadmap: {e}"}
\ No newline at end of file
+        if not isinstance(e, LLMUnavailableError):
+            print(f"Gemini API Error in generate_roadmap_with_gemini: {e}")
+        raise as_unavailable(e) from e
@@ -0,0 +1,94 @@
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from cache import LRUCache, SingleFlight, make_cache_key
+
+JOB_CACHE_MAX_ENTRIES = int(os.getenv("JOB_CACHE_MAX_ENTRIES", "256"))
+# Entries younger than the TTL are served as-is; within the following stale
+# window they are served immediately while a background refresh runs
+JOB_CACHE_TTL = float(os.getenv("JOB_CACHE_TTL", "900"))
+JOB_CACHE_STALE_WINDOW = float(os.getenv("JOB_CACHE_STALE_WINDOW", "3600"))
+
+
+def normalize_query(job_title: str, location: str, keywords: List[str]) -> Tuple[str, str, Tuple[str, ...]]:
+    normalize = lambda text: " ".join(text.lower().split())
+    return (
+        normalize(job_title),
+        normalize(location),
+        tuple(sorted({normalize(keyword) for keyword in keywords if keyword.strip()})),
+    )
+
+
+class JobSearchCache:
+    """
+    Stale-while-revalidate cache for job searches. Concurrent misses and
+    refreshes for the same query share one fetch.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, stale_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._entries = LRUCache(max_entries, ttl_seconds + stale_seconds)
+        self._flights = SingleFlight()
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    async def _fetch_and_store(self, key: str, fetch: Callable[[], Awaitable[List[Dict]]]) -> List[Dict]:
+        jobs = await fetch()
+        # An empty result usually means LinkedIn throttled us; keep serving what we had
+        if jobs:
+            self._entries.set(key, jobs)
+        return jobs
+
+    async def _refresh(self, key: str, fetch: Callable[[], Awaitable[List[Dict]]]) -> None:
+        self.refreshes += 1
+        try:
+            await self._fetch_and_store(key, fetch)
+        except Exception as e:
+            self.refresh_errors += 1
+            print(f"Background job search refresh failed: {e}")
+
+    async def get_or_fetch(
+        self,
+        job_title: str,
+        location: str,
+        keywords: List[str],
+        fetch: Callable[[], Awaitable[List[Dict]]],
+    ) -> Tuple[List[Dict], str]:
+        """Returns (jobs, status) where status is "HIT", "STALE" or "MISS"."""
+        title, place, terms = normalize_query(job_title, location, keywords)
+        key = make_cache_key(title, place, *terms)
+        entry = self._entries.get_entry(key)
+        if entry is not None:
+            jobs, stored_at = entry
+            if time.time() - stored_at <= self.ttl_seconds:
+                self.fresh_hits += 1
+                return jobs, "HIT"
+            self.stale_hits += 1
+            self._flights.start(f"refresh:{key}", lambda: self._refresh(key, fetch))
+            return jobs, "STALE"
+
+        self.misses += 1
+        return await self._flights.do(key, lambda: self._fetch_and_store(key, fetch)), "MISS"
+
+    def stats(self) -> Dict:
+        lookups = self.fresh_hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self._entries.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_window_seconds": self.stale_seconds,
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "hit_rate": round((self.fresh_hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+job_search_cache = JobSearchCache(JOB_CACHE_MAX_ENTRIES, JOB_CACHE_TTL, JOB_CACHE_STALE_WINDOW)
@@ -0,0 +1,152 @@
+"""
+Tail-latency and failure protection for model calls: a rolling latency window
+that supplies the hedging delay, a hedged-call helper that starts a duplicate
+attempt when the first one is slow, and a circuit breaker that stops sending
+calls while the recent error rate is high.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Tuple
+
+
+class LatencyWindow:
+    """Latencies (seconds) of the most recent successful calls."""
+
+    def __init__(self, size: int):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgeStats:
+    def __init__(self):
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_rate": round(self.hedge_wins / self.hedged, 3) if self.hedged else 0.0,
+        }
+
+
+async def hedged(
+    call: Callable[[], Awaitable], delay: float, can_hedge: Callable[[], bool], stats: HedgeStats
+) -> Tuple[object, str]:
+    """
+    Runs `call`; if it has not finished after `delay` seconds and `can_hedge()`
+    allows it, starts a second attempt and returns whichever succeeds first.
+    Errors are only raised once every attempt has failed. Returns
+    (result, winner) where winner is "unhedged", "primary" or "hedge".
+    """
+    stats.calls += 1
+    primary = asyncio.ensure_future(call())
+    attempts = [primary]
+    try:
+        if delay > 0:
+            await asyncio.wait(attempts, timeout=delay)
+            if not primary.done() and can_hedge():
+                stats.hedged += 1
+                attempts.append(asyncio.ensure_future(call()))
+
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is None:
+                    if len(attempts) == 1:
+                        return attempt.result(), "unhedged"
+                    if attempt is not primary:
+                        stats.hedge_wins += 1
+                        return attempt.result(), "hedge"
+                    return attempt.result(), "primary"
+                error = attempt.exception()
+        raise error
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
+
+
+class CircuitBreaker:
+    """
+    Opens when at least `error_rate` of the last `window` calls failed (once
+    `min_calls` have been seen). While open, calls are refused; after
+    `cooldown` seconds one probe call is let through (half-open), and its
+    outcome closes or re-opens the breaker.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, window: int, min_calls: int, error_rate: float, cooldown: float):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def abandon(self) -> None:
+        """Releases a half-open probe whose call ended without a verdict (e.g. cancelled or rejected locally)."""
+        if self.state == self.HALF_OPEN:
+            self._probe_in_flight = False
+
+    def record(self, success: bool) -> None:
+        if self.state == self.HALF_OPEN:
+            self._probe_in_flight = False
+            if success:
+                self.state = self.CLOSED
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+        self._outcomes.append(success)
+        if self.state == self.CLOSED and len(self._outcomes) >= self.min_calls and self.current_error_rate() >= self.error_rate:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+
+    def current_error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "error_rate": round(self.current_error_rate(), 3),
+            "window_calls": len(self._outcomes),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,157 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+VOCABULARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "skills_vocabulary.json")
+LOCAL_KEYWORDS_LIMIT = int(os.getenv("LOCAL_KEYWORDS_LIMIT", "5"))
+
+# Fit at which the local score reaches 100: resumes rarely list most of a profile's skills
+FULL_FIT = 0.6
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#./-]*")
+
+
+def tokenize(text: str) -> List[str]:
+    # Keep symbols that belong to skill names (c++, c#, node.js, ci/cd) but drop trailing punctuation
+    return [token.rstrip("./-") for token in _TOKEN_RE.findall(text.lower())]
+
+
+class SkillsEngine:
+    """
+    Deterministic resume scorer built from the bundled skills vocabulary. Every
+    job profile is a row of IDF-weighted skills in one L2-normalized matrix, so
+    fitting a resume against all profiles is a single matrix-vector product.
+    """
+
+    def __init__(self, vocabulary: Dict):
+        self.aliases = vocabulary["aliases"]
+        self.profile_names = list(vocabulary["profiles"])
+        self.profiles = [vocabulary["profiles"][name] for name in self.profile_names]
+
+        skills = sorted({skill for profile in self.profiles for skill in profile["skills"]})
+        self.skills = skills
+        self.skill_index = {skill: i for i, skill in enumerate(skills)}
+        self.max_ngram = max(len(term.split()) for term in list(skills) + list(self.aliases))
+
+        # Skills shared by many profiles say little about fit, so weight them down
+        presence = np.zeros((len(self.profiles), len(skills)), dtype=np.float32)
+        for row, profile in enumerate(self.profiles):
+            for skill in profile["skills"]:
+                presence[row, self.skill_index[skill]] = 1.0
+        document_frequency = presence.sum(axis=0)
+        self.idf = (np.log((1 + len(self.profiles)) / (1 + document_frequency)) + 1).astype(np.float32)
+        self.presence = presence
+        weighted = presence * self.idf
+        self.profile_matrix = weighted / np.linalg.norm(weighted, axis=1, keepdims=True)
+
+        self.title_tokens = [
+            {token for title in [name] + profile.get("titles", []) for token in tokenize(title)}
+            for name, profile in zip(self.profile_names, self.profiles)
+        ]
+
+    def skill_counts(self, text: str) -> Counter:
+        """Counts vocabulary skills in the text, matching n-grams up to the longest skill name."""
+        tokens = tokenize(text)
+        counts = Counter()
+        for n in range(1, self.max_ngram + 1):
+            for i in range(len(tokens) - n + 1):
+                term = " ".join(tokens[i:i + n])
+                term = self.aliases.get(term, term)
+                if term in self.skill_index:
+                    counts[term] += 1
+        return counts
+
+    def resume_vector(self, counts: Counter) -> np.ndarray:
+        vector = np.zeros(len(self.skills), dtype=np.float32)
+        for skill, count in counts.items():
+            vector[self.skill_index[skill]] = 1 + math.log(count)
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def match_profile(self, job_title: str) -> Optional[int]:
+        """Index of the profile whose titles best overlap the job title, if any overlap."""
+        tokens = set(tokenize(job_title))
+        if not tokens:
+            return None
+        overlaps = [len(tokens & profile_tokens) / len(tokens | profile_tokens) for profile_tokens in self.title_tokens]
+        best = int(np.argmax(overlaps))
+        return best if overlaps[best] > 0 else None
+
+    def analyze(self, resume_text: str, job_title: str) -> Dict:
+        counts = self.skill_counts(resume_text)
+        vector = self.resume_vector(counts)
+        similarities = self.profile_matrix @ vector
+
+        field_row = int(np.argmax(similarities))
+        target_row = self.match_profile(job_title)
+        if target_row is None:
+            target_row = field_row
+
+        target_weights = self.presence[target_row] * self.idf
+        has_skill = vector > 0
+        coverage = float(target_weights[has_skill].sum() / target_weights.sum())
+        fit = 0.6 * coverage + 0.4 * float(similarities[target_row])
+        score = int(round(100 * min(1.0, fit / FULL_FIT)))
+
+        # Keywords: resume skills ranked by weight, skills the target role wants first
+        ranked = sorted(counts, key=lambda skill: (
+            -self.presence[target_row, self.skill_index[skill]],
+            -vector[self.skill_index[skill]],
+            skill,
+        ))
+        matched = [skill for skill in ranked if self.presence[target_row, self.skill_index[skill]]]
+        missing_rows = np.flatnonzero((self.presence[target_row] > 0) & ~has_skill)
+        missing = [self.skills[i] for i in missing_rows[np.argsort(-self.idf[missing_rows], kind="stable")]]
+
+        return {
+            "score": score,
+            "keywords": ranked[:LOCAL_KEYWORDS_LIMIT],
+            "field_of_interest": self.profiles[field_row]["field"],
+            "matched_skills": matched,
+            "missing_skills": missing,
+            "target_profile": self.profile_names[target_row],
+        }
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> SkillsEngine:
+    with open(VOCABULARY_PATH, encoding="utf-8") as f:
+        return SkillsEngine(json.load(f))
+
+
+def analyze_resume_locally(resume_text: str, job_title: str) -> Dict:
+    """
+    Full analysis in the same shape as the Gemini analysis, computed without an
+    LLM round trip. Used as the provisional score and as the fast-mode result.
+    """
+    fit = get_engine().analyze(resume_text, job_title)
+    missing = fit["missing_skills"]
+    matched = fit["matched_skills"]
+
+    suggestions = [f"Add concrete experience with {skill} if you have it; it is commonly expected for {job_title} roles." for skill in missing[:3]]
+    if not suggestions:
+        suggestions = [f"Quantify the impact of your {job_title}-relevant projects with metrics."]
+
+    return {
+        "score": fit["score"],
+        "suggestions": suggestions,
+        "field_of_interest": fit["field_of_interest"],
+        "keywords": fit["keywords"],
+        "detailed_analysis": {
+            "overall_assessment": (
+                f"Keyword-based estimate: the resume covers {len(matched)} of the skills typically "
+                f"listed for {fit['target_profile']} roles."
+            ),
+            "strengths": [f"Mentions {skill}." for skill in matched[:5]] or ["No role-specific skills were detected."],
+            "weaknesses": [f"No mention of {skill}." for skill in missing[:5]],
+            "reasoning_for_field": f"The detected skills overlap most with the {fit['field_of_interest']} profile.",
+        },
+        "mode": "fast",
+    }
@@ -1,49 +1,402 @@
-from fastapi import FastAPI, UploadFile, File, Form
+import asyncio
+import hmac
+import json
+import os
+import time
+import zipfile
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from gemini_resume_analyzer import analyze_resume_with_gemini, generate_roadmap_with_gemini
-import pdfplumber
-from typing import Dict, List, Optional
-from scrapers import linkedin_scraper
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from gemini_resume_analyzer import (
+    analyze_resume_cached,
+    stream_analysis_with_gemini,
+    stream_session_analysis,
+    analyze_resume_in_session,
+    get_roadmap_cached,
+    prefetch_roadmap,
+    get_model,
+    warm_roadmap_cache,
+    get_llm_pool_stats,
+    invalidate_analysis_cache,
+    normalize_job_title,
+    analysis_cache,
+    roadmap_cache,
+    analysis_sessions,
+    ROADMAP_WARMUP_FIELDS,
+    LLMUnavailableError,
+    GEMINI_MAX_CONCURRENCY,
+    llm_pool,
+    gemini_breaker,
+)
+from pdf_extraction import shutdown_executor, warm_up_executor, PDFExtractionError, PDFTooLargeError
+from resume_files import (
+    extract_resume_text,
+    is_zip_archive,
+    spool_archive_members,
+    spool_upload,
+    SpooledUpload,
+    ResumeFileError,
+    FileTooLargeError,
+    UnsupportedFileTypeError,
+    UPLOAD_MAX_BYTES,
+)
+from typing import Dict, List, Optional, Tuple, Union
+from task_queue import Task, TaskQueue, TaskQueueFullError, TASK_WORKERS, TASK_QUEUE_MAX
+from cache import make_cache_key
+from scrapers import SOURCES, enabled_sources, search_sources, stream_sources
+from job_search_cache import job_search_cache
+from postings_index import get_postings_index, POSTINGS_TOP_K
+from local_analyzer import get_engine
+from metrics import METRICS_ENABLED, Counter, Gauge, MetricsMiddleware, render_metrics, span
+
+# Batch analysis limits
+BATCH_MAX_RESUMES = int(os.getenv("BATCH_MAX_RESUMES", "200"))
+BATCH_MAX_TITLES = int(os.getenv("BATCH_MAX_TITLES", "20"))
+# Cap on resume x job title lines in one batch response
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(GEMINI_MAX_CONCURRENCY)))
+# Size cap for an uploaded zip of resumes; each member is still held to UPLOAD_MAX_BYTES
+BATCH_ARCHIVE_MAX_BYTES = int(os.getenv("BATCH_ARCHIVE_MAX_BYTES", str(100 * 1024 * 1024)))
+# Token for the /admin endpoints, sent as X-Admin-Token; unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+cache_lookups = Counter("resume_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result"))
+
+def upload_error(e: Exception) -> HTTPException:
+    if isinstance(e, (FileTooLargeError, PDFTooLargeError)):
+        return HTTPException(status_code=413, detail=str(e))
+    if isinstance(e, UnsupportedFileTypeError):
+        return HTTPException(status_code=415, detail=str(e))
+    return HTTPException(status_code=422, detail=str(e))
+
+def analysis_events(resume_text: str, job_title: str, fast: bool, session_id: Optional[str]):
+    # With a session ID, re-uploads only send their changed sections to Gemini
+    if session_id:
+        return stream_session_analysis(resume_text, job_title, session_id, fast)
+    return stream_analysis_with_gemini(resume_text, job_title, fast)
+
+async def run_analysis_task(task: Task) -> Dict:
+    # Streams the analysis so pollers can see score/suggestions before it finishes
+    spooled = task.payload["upload"]
+    try:
+        resume_text = await extract_resume_text(spooled.path)
+    finally:
+        spooled.cleanup()
+    result = None
+    async for event, payload in analysis_events(
+        resume_text, task.payload["job_title"], task.payload["fast"], task.payload["session_id"]
+    ):
+        if event == "partial":
+            task.partial.update(payload)
+        elif event == "result":
+            result = payload
+            prefetch_roadmap(result)
+    return result
+
+analysis_tasks = TaskQueue(run_analysis_task, TASK_WORKERS, TASK_QUEUE_MAX)
+
+Gauge("resume_llm_in_flight", "Gemini calls currently running.", lambda: llm_pool.in_flight)
+Gauge("resume_llm_queued", "Gemini calls waiting for a pool slot.", lambda: llm_pool.queued)
+Gauge(
+    "resume_llm_breaker_state",
+    "Gemini circuit breaker state (0 closed, 1 half-open, 2 open).",
+    lambda: {"closed": 0, "half_open": 1, "open": 2}[gemini_breaker.state],
+)
+Gauge("resume_analysis_tasks_queued", "Analysis tasks waiting for a worker.", lambda: analysis_tasks.stats()["queued"])
+
+# Warm-up state reported by /ready: component -> "pending", "ready" or "failed: ..."
+readiness: Dict[str, str] = {"gemini_client": "pending", "skills_engine": "pending", "pdf_workers": "pending"}
+startup_started = time.perf_counter()
+ready_after: Optional[float] = None
+
+async def warm_up_component(name: str, warm_up) -> None:
+    try:
+        await warm_up()
+        readiness[name] = "ready"
+    except Exception as e:
+        print(f"Warm-up of {name} failed: {e}")
+        readiness[name] = f"failed: {e}"
+
+async def warm_up() -> None:
+    """
+    Loads the heavy pieces (Gemini client, skills engine, PDF worker processes)
+    in the background so the first requests do not pay for them, then warms
+    the roadmap cache.
+    """
+    global ready_after
+    await asyncio.gather(
+        warm_up_component("gemini_client", lambda: asyncio.to_thread(get_model)),
+        warm_up_component("skills_engine", lambda: asyncio.to_thread(get_engine)),
+        warm_up_component("pdf_workers", warm_up_executor),
+    )
+    ready_after = time.perf_counter() - startup_started
+    if ROADMAP_WARMUP_FIELDS:
+        await warm_roadmap_cache()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up runs in the background so the server starts accepting requests immediately
+    warmup_task = asyncio.create_task(warm_up())
+    analysis_tasks.start()
+    yield
+    await analysis_tasks.stop()
+    warmup_task.cancel()
+    shutdown_executor()
+    for source in SOURCES.values():
+        await source.close()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-def extract_text_from_pdf(file: UploadFile) -> str:
-    try:
-        with pdfplumber.open(file.file) as pdf:
-            return "\n".join(page.extract_text() for page in pdf.pages if page.extract_text())
-    except Exception as e:
-        return f"Error reading PDF: {e}"
+app.add_middleware(MetricsMiddleware)
 
 @app.post("/analyze_resume")
-async def analyze_resume(resume: UploadFile = File(...), job_title: str = Form(...)) -> Dict:
-    if resume.filename.endswith(".pdf"):
-        resume_text = extract_text_from_pdf(resume)
-    else:
-        resume_text = (await resume.read()).decode("utf-8", errors="ignore")
+async def analyze_resume(
+    response: Response,
+    resume: UploadFile = File(...),
+    job_title: str = Form(...),
+    fast: bool = Form(False),
+    session_id: Optional[str] = Form(None),
+) -> Dict:
+    try:
+        spooled = await spool_upload(resume)
+        try:
+            resume_text = await extract_resume_text(spooled.path)
+        finally:
+            spooled.cleanup()
+    except (ResumeFileError, PDFExtractionError) as e:
+        raise upload_error(e)
 
-    analysis_result = analyze_resume_with_gemini(resume_text, job_title)
+    try:
+        if session_id:
+            analysis_result, cache_hit = await analyze_resume_in_session(resume_text, job_title, session_id, fast)
+        else:
+            analysis_result, cache_hit = await analyze_resume_cached(resume_text, job_title, fast)
+    except LLMUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+    if not fast:
+        cache_lookups.inc(cache="analysis", result=response.headers["X-Cache"])
+    # Most users ask for the roadmap next; start it while they read the analysis
+    prefetch_roadmap(analysis_result)
     return analysis_result
 
-async def get_job_postings_internal(job_title: str, location: str, keywords: List[str]) -> List[dict]:
-    # Renamed this to avoid confusion with the endpoint function
-    # This is the actual logic that calls your linkedin_scraper
-    job_postings = []
-    linkedin_jobs = await linkedin_scraper.scrape_linkedin(job_title, location, "", keywords)
-    job_postings.extend(linkedin_jobs)
-    return job_postings
+@app.post("/analysis_tasks", status_code=202)
+async def submit_analysis_task(
+    resume: UploadFile = File(...),
+    job_title: str = Form(...),
+    fast: bool = Form(False),
+    session_id: Optional[str] = Form(None),
+) -> Dict:
+    """
+    Queues an analysis and returns its task ID immediately. Submitting the same
+    file and job title again returns the existing task instead of new work.
+    """
+    try:
+        spooled = await spool_upload(resume)
+    except ResumeFileError as e:
+        raise upload_error(e)
+    key = make_cache_key(spooled.sha256, normalize_job_title(job_title), str(fast), session_id or "")
+    payload = {"upload": spooled, "job_title": job_title, "fast": fast, "session_id": session_id}
+    try:
+        task = analysis_tasks.submit(key, payload)
+    except TaskQueueFullError as e:
+        spooled.cleanup()
+        raise HTTPException(status_code=503, detail=str(e))
+    if task.payload is not payload:
+        spooled.cleanup()  # Deduplicated onto an existing task, which has its own copy
+    return task.to_dict()
+
+@app.get("/analysis_tasks/{task_id}")
+async def get_analysis_task(task_id: str) -> Dict:
+    # Status is queued, running (with any partial fields), done (with result) or failed (with error)
+    task = analysis_tasks.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired task ID.")
+    return task.to_dict()
+
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/analyze_resume/stream")
+async def analyze_resume_stream(
+    resume: UploadFile = File(...),
+    job_title: str = Form(...),
+    fast: bool = Form(False),
+    session_id: Optional[str] = Form(None),
+) -> StreamingResponse:
+    """
+    Server-sent-event variant of /analyze_resume. Emits "extracted" once the
+    resume text is ready, "partial" events as score, suggestions and field of
+    interest become parseable, then a "result" event with the full analysis
+    (or an "error" event).
+    """
+    # Spool before responding: the upload is closed once the streaming response starts
+    try:
+        spooled = await spool_upload(resume)
+    except ResumeFileError as e:
+        raise upload_error(e)
+
+    async def stream():
+        try:
+            try:
+                resume_text = await extract_resume_text(spooled.path)
+            finally:
+                spooled.cleanup()
+            yield sse_event("extracted", {"characters": len(resume_text)})
+            async for event, payload in analysis_events(resume_text, job_title, fast, session_id):
+                if event == "result":
+                    prefetch_roadmap(payload)
+                yield sse_event(event, payload)
+        except (ResumeFileError, PDFExtractionError, LLMUnavailableError) as e:
+            yield sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also removes the file if the client disconnects before the stream starts
+        background=BackgroundTask(spooled.cleanup),
+    )
+
+async def read_batch_uploads(resumes: List[UploadFile]) -> List[SpooledUpload]:
+    """
+    Spools uploaded resumes to disk, expanding zip archives into their member
+    files. Archives are recognised by their magic bytes, not the filename, so a
+    DOCX (also a zip) is kept as a resume.
+    """
+    files: List[SpooledUpload] = []
+    try:
+        for upload in resumes:
+            head = await upload.read(4)
+            await upload.seek(0)
+            if head != b"PK\x03\x04":
+                files.append(await spool_upload(upload))
+                continue
+            spooled = await spool_upload(upload, BATCH_ARCHIVE_MAX_BYTES)
+            if not await asyncio.to_thread(is_zip_archive, spooled.path):
+                files.append(spooled)
+                if spooled.size > UPLOAD_MAX_BYTES:
+                    raise FileTooLargeError(f"Upload is larger than the {UPLOAD_MAX_BYTES}-byte limit.")
+                continue
+            try:
+                files.extend(await asyncio.to_thread(
+                    spool_archive_members, spooled.path, BATCH_MAX_RESUMES - len(files)
+                ))
+            except zipfile.BadZipFile as e:
+                raise HTTPException(status_code=422, detail=f"Invalid zip archive {upload.filename}: {e}")
+            finally:
+                spooled.cleanup()
+            if len(files) > BATCH_MAX_RESUMES:
+                raise HTTPException(status_code=413, detail=f"A batch may contain at most {BATCH_MAX_RESUMES} resumes.")
+    except BaseException as e:
+        for spooled in files:
+            spooled.cleanup()
+        if isinstance(e, ResumeFileError):
+            raise upload_error(e)
+        raise
+    return files
+
+@app.post("/analyze_resume/batch")
+async def analyze_resume_batch(
+    resumes: List[UploadFile] = File(...),
+    job_titles: List[str] = Form(...),
+    fast: bool = Form(False),
+) -> StreamingResponse:
+    """
+    Analyzes every resume (or resume inside an uploaded zip) against every job
+    title. Results are streamed as NDJSON lines in completion order; a failing
+    item produces an "error" line without affecting the rest of the batch.
+    Identical resumes and job titles differing only in case or spacing are
+    analyzed once, and the result is repeated on each of their lines.
+    """
+    titles = [title.strip() for title in job_titles if title.strip()]
+    if not titles:
+        raise HTTPException(status_code=422, detail="At least one job title is required.")
+    if len(titles) > BATCH_MAX_TITLES:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {BATCH_MAX_TITLES} job titles.")
+    # Spool everything up front: uploads are closed once the streaming response starts
+    files = await read_batch_uploads(resumes)
+    if len(files) * len(titles) > BATCH_MAX_ITEMS:
+        for spooled in files:
+            spooled.cleanup()
+        raise HTTPException(
+            status_code=413, detail=f"A batch may contain at most {BATCH_MAX_ITEMS} resume and job title pairs."
+        )
+
+    async def extract(spooled: SpooledUpload) -> str:
+        try:
+            return await extract_resume_text(spooled.path)
+        finally:
+            spooled.cleanup()
+
+    async def stream():
+        # Lines are grouped by (resume content, normalized title); each group is analyzed once
+        groups: Dict[Tuple[str, str], List[Dict]] = {}
+        for spooled in files:
+            for title in titles:
+                key = (spooled.sha256, normalize_job_title(title))
+                groups.setdefault(key, []).append({"resume": spooled.filename, "job_title": title})
+        # Each distinct resume is extracted once and shared by all of its job titles;
+        # duplicate copies are left to the cleanup task
+        unique_files: Dict[str, SpooledUpload] = {}
+        for spooled in files:
+            unique_files.setdefault(spooled.sha256, spooled)
+        extractions = {sha256: asyncio.ensure_future(extract(spooled)) for sha256, spooled in unique_files.items()}
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+        async def run_group(sha256: str, lines: List[Dict]) -> Tuple[List[Dict], Dict]:
+            try:
+                resume_text = await extractions[sha256]
+                async with semaphore:
+                    result, cache_hit = await analyze_resume_cached(resume_text, lines[0]["job_title"], fast)
+                return lines, {"cached": cache_hit, "result": result}
+            except Exception as e:
+                return lines, {"error": str(e)}
+
+        tasks = [asyncio.ensure_future(run_group(sha256, lines)) for (sha256, _), lines in groups.items()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                lines, outcome = await next_done
+                for line in lines:
+                    yield json.dumps({**line, **outcome}) + "\n"
+        finally:
+            # Client went away or the batch finished: don't leave work running
+            for task in tasks + list(extractions.values()):
+                task.cancel()
+
+    def cleanup() -> None:
+        for spooled in files:
+            spooled.cleanup()
+
+    # The background task also covers clients that disconnect before the stream starts
+    return StreamingResponse(stream(), media_type="application/x-ndjson", background=BackgroundTask(cleanup))
+
+async def get_job_postings_internal(job_title: str, location: str, keywords: List[str]) -> Tuple[List[dict], Dict[str, Dict]]:
+    # Runs every enabled job source concurrently, each under its own deadline,
+    # and returns the merged postings plus per-source status and timing
+    return await search_sources(enabled_sources(), job_title, location, keywords)
+
+def server_timing(report: Dict[str, Dict]) -> str:
+    return ", ".join(
+        f'{name};dur={status["elapsed_ms"]};desc="{status["status"]} ({status["count"]})"'
+        for name, status in report.items()
+    )
 
 # NOW, this is the FastAPI endpoint that your frontend will call:
 @app.post("/get_job_postings") # <--- THIS IS THE ENDPOINT DECORATOR
-async def get_job_postings_api(request_body: Dict) -> List[Dict]:
+async def get_job_postings_api(request_body: Dict, response: Response) -> Union[List[Dict], Dict]:
     """
     FastAPI endpoint to fetch job postings from the frontend.
     Expects 'job_title', 'location', and 'keywords' in the request body.
+    Results are ranked by relevance unless 'rank' is false; 'top_k' caps them.
+    With 'include_sources', returns {"jobs", "sources", "cache"} instead of a bare list.
     """
     job_title = request_body.get("job_title")
     location = request_body.get("location")
@@ -53,18 +406,121 @@ async def get_job_postings_api(request_body: Dict) -> List[Dict]:
         # Basic validation, consider returning a proper HTTP error
         return {"error": "Job title and location are required."} # FastAPI automatically handles 422 if Pydantic is used, but this is fine for now
 
-    # Call your internal helper function that contains the scraping logic
-    job_results = await get_job_postings_internal(job_title, location, keywords)
+    # Served from the job search cache; stale entries are refreshed in the background
+    source_report = {}
+
+    async def fetch() -> List[Dict]:
+        jobs, report = await get_job_postings_internal(job_title, location, keywords)
+        source_report.update(report)
+        # Don't cache an outage as "no jobs": stale entries are kept and a miss gets a 503
+        if report and all(status["status"] != "ok" for status in report.values()):
+            raise HTTPException(status_code=503, detail=f"Every job source failed: {report}")
+        return jobs
+
+    with span("job_search"):
+        job_results, cache_status = await job_search_cache.get_or_fetch(job_title, location, keywords, fetch)
+    response.headers["X-Cache"] = cache_status
+    cache_lookups.inc(cache="job_search", result=cache_status)
+    if source_report:
+        response.headers["Server-Timing"] = server_timing(source_report)
+
+    # Rank the fresh results together with previously indexed postings for this location
+    index = get_postings_index()
+    with span("postings_index_add"):
+        await asyncio.to_thread(index.add, job_results)
+    if request_body.get("rank", True):
+        query_terms = [job_title, request_body.get("field_of_interest", "")] + list(keywords)
+        with span("postings_rank"):
+            job_results = await asyncio.to_thread(
+                index.rank, query_terms, location, request_body.get("top_k", POSTINGS_TOP_K), job_results
+            )
+    if request_body.get("include_sources"):
+        return {"jobs": job_results, "sources": source_report, "cache": cache_status}
     return job_results
 
+@app.post("/get_job_postings/stream")
+async def get_job_postings_stream(request_body: Dict) -> StreamingResponse:
+    """
+    Streaming variant of /get_job_postings: one NDJSON line per job source as
+    soon as it finishes (or hits its deadline), with its new, deduplicated jobs
+    and its status and timing. Bypasses the job search cache and ranking.
+    """
+    job_title = request_body.get("job_title")
+    location = request_body.get("location")
+    keywords = request_body.get("keywords", [])
+    if not job_title or not location:
+        raise HTTPException(status_code=422, detail="Job title and location are required.")
+
+    async def stream():
+        index = get_postings_index()
+        async for source, jobs, status in stream_sources(enabled_sources(), job_title, location, keywords):
+            await asyncio.to_thread(index.add, jobs)
+            yield json.dumps({"source": source, "jobs": jobs, **status}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @app.post("/generate_roadmap")
-async def generate_roadmap_endpoint(request_body: Dict) -> Dict:
+async def generate_roadmap_endpoint(request_body: Dict, response: Response) -> Dict:
     # FastAPI endpoint
     field_of_interest = request_body.get("field_of_interest")
     if not field_of_interest:
         return {"error": "Field of interest is required for roadmap generation."}
 
-    # Call the new function from gemini_resume_analyzer
-    roadmap_data = generate_roadmap_with_gemini(field_of_interest)
+    try:
+        roadmap_data, cache_hit = await get_roadmap_cached(field_of_interest)
+    except LLMUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+    cache_lookups.inc(cache="roadmap", result=response.headers["X-Cache"])
     return roadmap_data
 
+@app.get("/ready")
+async def ready(response: Response) -> Dict:
+    # Readiness probe: 503 until warm-up has finished (components that failed load lazily on first use)
+    is_ready = all(status != "pending" for status in readiness.values())
+    if not is_ready:
+        response.status_code = 503
+    return {
+        "ready": is_ready,
+        "components": readiness,
+        "ready_after_s": round(ready_after, 3) if ready_after is not None else None,
+    }
+
+@app.get("/llm_pool/stats")
+async def llm_pool_stats() -> Dict:
+    # In-flight / queued gauges and queue-wait timings for the Gemini pool, plus breaker state and hedge win rate
+    return {**get_llm_pool_stats(), "analysis_tasks": analysis_tasks.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> PlainTextResponse:
+    # Prometheus text exposition; disabled (404) when METRICS_ENABLED=0
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+def require_admin(token: Optional[str]) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled.")
+    if token is None or not hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid admin token.")
+
+@app.get("/admin/cache/stats")
+async def cache_stats(x_admin_token: Optional[str] = Header(None)) -> Dict:
+    require_admin(x_admin_token)
+    return {
+        "analysis": await analysis_cache.stats(),
+        "roadmap": await roadmap_cache.stats(),
+        "analysis_sessions": await analysis_sessions.stats(),
+        "job_search": job_search_cache.stats(),
+        "postings_index": get_postings_index().stats(),
+    }
+
+@app.post("/admin/cache/invalidate")
+async def cache_invalidate(request_body: Dict, x_admin_token: Optional[str] = Header(None)) -> Dict:
+    """
+    Invalidates analysis cache entries. Accepts an optional 'key' or 'job_title';
+    with neither, the whole cache is cleared.
+    """
+    require_admin(x_admin_token)
+    removed = await invalidate_analysis_cache(request_body.get("key"), request_body.get("job_title"))
+    return {"removed": removed}
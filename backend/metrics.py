@@ -0,0 +1,219 @@
+"""
+Minimal in-process metrics with Prometheus text exposition. Counters and
+histograms are plain dicts keyed by label values, so recording is a dict
+lookup plus a bisect; `span()` times one stage of a request into the shared
+stage histogram. Set METRICS_ENABLED=0 to make every recording call a no-op
+and disable /metrics.
+"""
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+
+# Seconds; covers cache hits (sub-millisecond) through slow Gemini calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """Gauge whose value is read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, read: Callable[[], float]):
+        super().__init__(name, description)
+        self.read = read
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name} {_format_value(self.read())}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+        # Per label set: [per-bucket counts (last slot is +Inf), sum, count]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+stage_seconds = Histogram("resume_stage_seconds", "Time spent in each processing stage.", ("stage",))
+request_seconds = Histogram(
+    "resume_http_request_seconds", "HTTP request latency by route.", ("method", "route", "status")
+)
+llm_tokens = Histogram(
+    "resume_llm_tokens", "Tokens per Gemini call.", ("call", "direction"), buckets=TOKEN_BUCKETS
+)
+prompt_tokens = Histogram(
+    "resume_compaction_tokens", "Resume tokens per prompt before and after compaction.", ("stage",),
+    buckets=TOKEN_BUCKETS,
+)
+prompt_tokens_saved = Counter("resume_prompt_tokens_saved_total", "Resume tokens removed by compaction.")
+sections_trimmed = Counter(
+    "resume_sections_trimmed_total", "Resume sections cut or dropped to fit the token budget.", ("section",)
+)
+llm_hedges = Counter("resume_llm_hedges_total", "Hedged Gemini calls by the attempt that won.", ("winner",))
+json_retries = Counter("resume_llm_json_retries_total", "Gemini calls repeated after a malformed JSON reply.", ("call",))
+roadmap_prefetch = Counter(
+    "resume_roadmap_prefetch_total", "Speculative roadmap prefetches by result.", ("result",)
+)
+session_analyses = Counter(
+    "resume_session_analyses_total", "Session analyses by mode (full, incremental, unchanged, cached).", ("mode",)
+)
+fallbacks = Counter("resume_fallbacks_total", "Responses served by a fallback path instead of Gemini.", ("reason",))
+errors = Counter("resume_errors_total", "Errors by processing stage.", ("stage",))
+
+
+@contextmanager
+def span(stage: str):
+    """Records the duration of the block under `stage`, and counts it as an error if it raises."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        errors.inc(stage=stage)
+        raise
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage=stage)
+
+
+def record_llm_usage(call: str, response) -> None:
+    """Records prompt/response token counts from a Gemini response's usage metadata, when present."""
+    if not METRICS_ENABLED:
+        return
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_token_count", 0)
+    response_tokens = getattr(usage, "candidates_token_count", 0)
+    if prompt_tokens:
+        llm_tokens.observe(prompt_tokens, call=call, direction="prompt")
+    if response_tokens:
+        llm_tokens.observe(response_tokens, call=call, direction="response")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency by route template (so path
+    parameters such as task IDs do not create new series). Latency runs until
+    the last body chunk is sent, which covers streamed responses too.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not METRICS_ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            request_seconds.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
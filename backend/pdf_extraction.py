@@ -0,0 +1,145 @@
+import asyncio
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Union
+
+from resume_compaction import PAGE_BREAK
+
+# Extraction budgets
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "30"))
+PDF_TIME_BUDGET = float(os.getenv("PDF_TIME_BUDGET", "20"))
+# Stop once this many characters have been collected (0 disables early stop)
+PDF_TARGET_CHARS = int(os.getenv("PDF_TARGET_CHARS", "0"))
+# Documents with at least this many pages are split across worker processes
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "6"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+class PDFExtractionError(Exception):
+    """Raised when a PDF cannot be turned into text."""
+
+
+class PDFTooLargeError(PDFExtractionError):
+    """Raised when a PDF exceeds the configured byte budget."""
+
+
+class PDFTimeoutError(PDFExtractionError):
+    """Raised when extraction does not finish within the time budget."""
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _executor
+
+
+async def warm_up_executor() -> None:
+    """Starts the worker processes and loads pdfplumber in them before the first upload."""
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    await asyncio.gather(*(loop.run_in_executor(executor, warm_up_worker) for _ in range(PDF_WORKERS)))
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def warm_up_worker() -> None:
+    # pdfplumber (and pdfminer) are imported in the workers, not at server import time
+    import pdfplumber  # noqa: F401
+
+
+def _open_pdf(source: Union[bytes, str]):
+    # A path is passed to workers as-is, so large uploads are not pickled across processes
+    import pdfplumber
+
+    return pdfplumber.open(source if isinstance(source, str) else io.BytesIO(source))
+
+
+def _count_pages(source: Union[bytes, str]) -> int:
+    with _open_pdf(source) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_pages(source: Union[bytes, str], start: int, end: int, deadline: float, target_chars: int) -> List[str]:
+    """
+    Runs in a worker process. Extracts pages [start, end) once each, stopping
+    early at the deadline or once `target_chars` characters are collected.
+    """
+    texts = []
+    collected = 0
+    with _open_pdf(source) as pdf:
+        for page in pdf.pages[start:end]:
+            if time.time() > deadline:
+                break
+            text = page.extract_text()
+            page.close()
+            if text:
+                texts.append(text)
+                collected += len(text)
+                if target_chars and collected >= target_chars:
+                    break
+    return texts
+
+
+async def extract_text_from_pdf(source: Union[bytes, str], target_chars: int = PDF_TARGET_CHARS) -> str:
+    """
+    Extracts text from PDF bytes or a file path in the worker pool, enforcing the byte, page and
+    time budgets. Long documents are split into page ranges extracted in parallel.
+    """
+    size = os.path.getsize(source) if isinstance(source, str) else len(source)
+    if size > PDF_MAX_BYTES:
+        raise PDFTooLargeError(f"PDF is {size} bytes; the limit is {PDF_MAX_BYTES}.")
+
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    deadline = time.time() + PDF_TIME_BUDGET
+
+    async def run():
+        page_count = min(await loop.run_in_executor(executor, _count_pages, source), PDF_MAX_PAGES)
+        if page_count < PDF_PARALLEL_MIN_PAGES or PDF_WORKERS < 2:
+            return await loop.run_in_executor(
+                executor, _extract_pages, source, 0, page_count, deadline, target_chars
+            )
+
+        # No chunk needs more than the target on its own; chunks are consumed in page
+        # order and the rest are cancelled (if not yet started) once the target is met
+        chunk = -(-page_count // PDF_WORKERS)
+        futures = [
+            loop.run_in_executor(executor, _extract_pages, source, start, min(start + chunk, page_count), deadline, target_chars)
+            for start in range(0, page_count, chunk)
+        ]
+        texts = []
+        collected = 0
+        try:
+            for future in futures:
+                for text in await future:
+                    texts.append(text)
+                    collected += len(text)
+                    if target_chars and collected >= target_chars:
+                        return texts
+            return texts
+        finally:
+            for future in futures:
+                future.cancel()
+
+    try:
+        texts = await asyncio.wait_for(run(), timeout=PDF_TIME_BUDGET)
+    except asyncio.TimeoutError:
+        raise PDFTimeoutError(f"PDF extraction exceeded the {PDF_TIME_BUDGET}s budget.")
+    except PDFExtractionError:
+        raise
+    except Exception as e:
+        raise PDFExtractionError(f"Error reading PDF: {e}")
+    # Page breaks are kept so compaction can spot headers and footers repeated on every page
+    return PAGE_BREAK.join(texts)
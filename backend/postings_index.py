@@ -0,0 +1,236 @@
+import json
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from local_analyzer import get_engine, tokenize
+from scrapers.dedupe import canonical_job_url, job_id
+
+try:
+    import fcntl
+except ImportError:  # Windows: lock the first byte of the lock file with msvcrt instead
+    fcntl = None
+    import msvcrt
+
+POSTINGS_INDEX_DIR = os.getenv(
+    "POSTINGS_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "postings_index")
+)
+POSTINGS_TOP_K = int(os.getenv("POSTINGS_TOP_K", "25"))
+# Postings older than this are left out of rankings (listings close quickly)
+POSTINGS_MAX_AGE_DAYS = float(os.getenv("POSTINGS_MAX_AGE_DAYS", "14"))
+
+VECTOR_DIM = 512
+INITIAL_CAPACITY = 1024
+
+
+def _feature_index(feature: str) -> tuple:
+    # crc32 is stable across processes, unlike hash(); the top bit picks the sign
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % VECTOR_DIM, 1.0 if h & 0x80000000 else -1.0
+
+
+def term_vector(texts: Iterable[str]) -> np.ndarray:
+    """
+    Hashed, L2-normalized unigram + bigram vector. Tokens go through the skills
+    alias table so "k8s" and "kubernetes" land on the same feature.
+    """
+    aliases = get_engine().aliases
+    counts: Dict[int, float] = {}
+    for text in texts:
+        tokens = [aliases.get(token, token) for token in tokenize(text)]
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            index, sign = _feature_index(feature)
+            counts[index] = counts.get(index, 0.0) + sign
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for index, value in counts.items():
+        vector[index] = value
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _lock_file(lock) -> None:
+    if fcntl is not None:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return
+    lock.seek(0)
+    while True:
+        try:
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:  # LK_LOCK gives up after about 10 s; keep waiting like flock does
+            continue
+
+
+def _unlock_file(lock) -> None:
+    if fcntl is not None:
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        return
+    lock.seek(0)
+    msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def posting_identity(job: Dict) -> str:
+    url = canonical_job_url(job.get("url", "#"))
+    return job_id(url) or (url if url != "#" else f"{job.get('title')}|{job.get('company')}|{job.get('location')}")
+
+
+class PostingsIndex:
+    """
+    Append-only index of scraped postings. Term vectors live in a memory-mapped
+    float32 matrix (vectors.f32) that grows in place; posting metadata is one
+    JSON line per row (postings.jsonl). Writers take a file lock so several
+    workers can share the directory, and readers pick up rows appended by other
+    processes before each search.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.meta_path = os.path.join(directory, "postings.jsonl")
+        self.lock_path = os.path.join(directory, "index.lock")
+        self.postings: List[Dict] = []
+        self.identities: Dict[str, int] = {}
+        self._meta_offset = 0
+        self._vectors: Optional[np.memmap] = None
+        self._capacity = 0
+        self._thread_lock = threading.RLock()
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock, open(self.lock_path, "a") as lock:
+            _lock_file(lock)
+            try:
+                yield
+            finally:
+                _unlock_file(lock)
+
+    def _map_vectors(self, min_rows: int) -> None:
+        """Maps the vector file, growing it (without rewriting existing rows) to fit min_rows."""
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        capacity = size // (VECTOR_DIM * 4)
+        if capacity < min_rows:
+            capacity = max(INITIAL_CAPACITY, capacity)
+            while capacity < min_rows:
+                capacity *= 2
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(capacity * VECTOR_DIM * 4)
+        if self._vectors is None or capacity != self._capacity:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, VECTOR_DIM))
+            self._capacity = capacity
+
+    def _load_new_rows(self) -> None:
+        """Reads metadata lines appended since the last call (by this or another process)."""
+        if not os.path.exists(self.meta_path) or os.path.getsize(self.meta_path) == self._meta_offset:
+            return
+        with open(self.meta_path, "rb") as f:
+            f.seek(self._meta_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Partially written line; pick it up next time
+                posting = json.loads(line)
+                self.identities[posting["id"]] = len(self.postings)
+                self.postings.append(posting)
+                self._meta_offset += len(line)
+        self._map_vectors(len(self.postings))
+
+    def add(self, jobs: List[Dict]) -> int:
+        """Appends postings not already indexed. Returns the number added."""
+        with self._locked():
+            self._load_new_rows()
+            new = []
+            for job in jobs:
+                identity = posting_identity(job)
+                if identity in self.identities:
+                    continue
+                self.identities[identity] = len(self.postings) + len(new)
+                new.append(dict(job, id=identity, indexed_at=time.time()))
+            if not new:
+                return 0
+
+            start = len(self.postings)
+            self._map_vectors(start + len(new))
+            for offset, posting in enumerate(new):
+                self._vectors[start + offset] = term_vector([posting.get("title", "")])
+            self._vectors.flush()
+            # Metadata is written after the vectors, so a row is only visible once its vector exists
+            with open(self.meta_path, "ab") as f:
+                lines = b"".join(json.dumps(posting).encode("utf-8") + b"\n" for posting in new)
+                f.write(lines)
+            self._meta_offset += len(lines)
+            self.postings.extend(new)
+            return len(new)
+
+    def rank(
+        self,
+        query_terms: List[str],
+        location: Optional[str] = None,
+        top_k: int = POSTINGS_TOP_K,
+        include: Iterable[Dict] = (),
+    ) -> List[Dict]:
+        """
+        Top-k postings by cosine similarity to the query terms. Older postings
+        must match the location; postings in `include` (the current search
+        results) are always eligible. Signed feature hashing can push the cosine
+        below zero, so relevance is clamped to [0, 1].
+        """
+        with self._thread_lock:
+            return self._rank(query_terms, location, top_k, include)
+
+    def _rank(self, query_terms: List[str], location: Optional[str], top_k: int, include: Iterable[Dict]) -> List[Dict]:
+        self._load_new_rows()
+        count = len(self.postings)
+        if not count:
+            return []
+        scores = np.asarray(self._vectors[:count] @ term_vector(query_terms))
+
+        cutoff = time.time() - POSTINGS_MAX_AGE_DAYS * 86400
+        eligible = np.fromiter((posting["indexed_at"] >= cutoff for posting in self.postings), dtype=bool, count=count)
+        if location:
+            needle = location.lower().strip()
+            eligible &= np.fromiter(
+                (needle in posting.get("location", "").lower() for posting in self.postings), dtype=bool, count=count
+            )
+        for job in include:
+            row = self.identities.get(posting_identity(job))
+            if row is not None:
+                eligible[row] = True
+        scores = np.where(eligible, scores, -np.inf)
+
+        k = min(top_k, int(eligible.sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        ranked = []
+        for row in top:
+            posting = {key: value for key, value in self.postings[row].items() if key not in ("id", "indexed_at")}
+            posting["relevance"] = round(max(0.0, float(scores[row])), 4)
+            ranked.append(posting)
+        return ranked
+
+    def stats(self) -> Dict:
+        with self._thread_lock:
+            self._load_new_rows()
+        return {
+            "postings": len(self.postings),
+            "capacity": self._capacity,
+            "vector_dim": VECTOR_DIM,
+            "directory": self.directory,
+        }
+
+
+_index: Optional[PostingsIndex] = None
+
+
+def get_postings_index() -> PostingsIndex:
+    global _index
+    if _index is None:
+        _index = PostingsIndex(POSTINGS_INDEX_DIR)
+    return _index
@@ -0,0 +1,163 @@
+"""
+Shrinks extracted resume text before it is pasted into a prompt: normalizes
+whitespace, drops page numbers and headers/footers repeated across pages,
+rejoins hyphenated line breaks, then splits the text into sections and fits it
+to a token budget, keeping high-priority sections (experience, skills) whole
+before lower-priority ones (hobbies, references).
+"""
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Page separator used by pdf_extraction when joining page texts
+PAGE_BREAK = "\f"
+
+# Rough characters per token for English resumes; callers can pass a ratio
+# calibrated with the model's token counter instead
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+# Lines this close to the top or bottom of a page are candidates for page furniture
+FURNITURE_LINES = 3
+
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "profile", "objective", "career objective", "about me"),
+    "experience": (
+        "experience", "work experience", "professional experience", "employment", "employment history",
+        "work history", "internships", "internship", "relevant experience",
+    ),
+    "skills": ("skills", "technical skills", "core competencies", "key skills", "technologies", "tech stack"),
+    "projects": ("projects", "personal projects", "academic projects", "key projects"),
+    "education": ("education", "academic background", "qualifications", "academic qualifications"),
+    "certifications": ("certifications", "certificates", "licenses and certifications", "courses"),
+    "achievements": ("achievements", "awards", "honors", "honours", "awards and achievements", "accomplishments"),
+    "publications": ("publications", "research", "papers"),
+    "volunteering": ("volunteering", "volunteer experience", "leadership", "positions of responsibility"),
+    "languages": ("languages",),
+    "hobbies": ("hobbies", "interests", "hobbies and interests", "extracurricular activities", "extra-curricular activities"),
+    "references": ("references",),
+}
+_HEADING_LOOKUP = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+
+# Kept first when the budget is tight; "header" is the text before the first heading (name, contact)
+SECTION_PRIORITY = (
+    "experience", "skills", "projects", "header", "summary", "education", "certifications",
+    "achievements", "publications", "volunteering", "other", "languages", "hobbies", "references",
+)
+
+_PAGE_NUMBER_RE = re.compile(r"^(page\s*)?\d{1,3}(\s*(of|/)\s*\d{1,3})?$", re.IGNORECASE)
+_PAGE_LABEL_RE = re.compile(r"page\s*\d{1,3}(\s*(of|/)\s*\d{1,3})?")
+_HYPHEN_BREAK_RE = re.compile(r"([a-z])-\n([a-z])")
+_SPACES_RE = re.compile(r"[ \t ]+")
+_BULLET_RE = re.compile(r"^[•●▪■◦‣∙·*]\s*")
+
+
+def estimate_tokens(text: str, chars_per_token: float = DEFAULT_CHARS_PER_TOKEN) -> int:
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+
+def _furniture_key(line: str) -> str:
+    # Page labels are masked so "Jane Doe - Page 2" matches "Jane Doe - Page 3"
+    return _PAGE_LABEL_RE.sub("page #", line.lower())
+
+
+def _page_furniture(pages: List[List[str]]) -> set:
+    """Lines near the top or bottom of pages that repeat on at least half of them (and on two or more)."""
+    if len(pages) < 2:
+        return set()
+    seen = Counter()
+    for lines in pages:
+        edges = lines[:FURNITURE_LINES] + lines[-FURNITURE_LINES:]
+        seen.update({_furniture_key(line) for line in edges})
+    threshold = max(2, math.ceil(len(pages) / 2))
+    return {line for line, count in seen.items() if count >= threshold}
+
+
+def clean_resume_text(text: str) -> str:
+    """Whitespace, page-number, page-furniture and hyphenation cleanup; keeps line structure."""
+    text = unicodedata.normalize("NFKC", text)
+    pages = []
+    for page in text.split(PAGE_BREAK):
+        lines = [_SPACES_RE.sub(" ", line).strip() for line in page.splitlines()]
+        pages.append([line for line in lines if line and not _PAGE_NUMBER_RE.match(line)])
+
+    # Repeated headers and footers are kept once: the header often carries the candidate's name
+    furniture = _page_furniture(pages)
+    seen = set()
+    lines = []
+    for page in pages:
+        for line in page:
+            key = _furniture_key(line)
+            if key in furniture:
+                if key in seen:
+                    continue
+                seen.add(key)
+            lines.append(_BULLET_RE.sub("- ", line))
+    return _HYPHEN_BREAK_RE.sub(r"\1\2", "\n".join(lines))
+
+
+def _heading(line: str) -> str:
+    if len(line) > 40:
+        return ""
+    return _HEADING_LOOKUP.get(line.lower().strip(" :-|").replace("&", "and"), "")
+
+
+def split_sections(text: str) -> List[Tuple[str, List[str]]]:
+    """Splits cleaned text into (section, lines) in document order; the heading line starts its section."""
+    sections: List[Tuple[str, List[str]]] = [("header", [])]
+    for line in text.splitlines():
+        section = _heading(line)
+        if section:
+            sections.append((section, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(name, lines) for name, lines in sections if lines]
+
+
+def trim_sections(
+    sections: List[Tuple[str, List[str]]], budget: int, chars_per_token: float
+) -> Tuple[Dict[int, List[str]], List[str]]:
+    """
+    Keeps sections in priority order until the budget runs out; the first
+    section that does not fit is cut at a line boundary and the rest are
+    dropped. Returns the kept lines by section index and the names of the
+    sections that were cut or dropped.
+    """
+    rank = {name: i for i, name in enumerate(SECTION_PRIORITY)}
+    order = sorted(range(len(sections)), key=lambda i: rank.get(sections[i][0], rank["other"]))
+    remaining = budget
+    kept: Dict[int, List[str]] = {}
+    trimmed = []
+    for i in order:
+        name, lines = sections[i]
+        cost = estimate_tokens("\n".join(lines), chars_per_token) + 1
+        if cost <= remaining:
+            kept[i] = lines
+            remaining -= cost
+            continue
+        partial = []
+        for line in lines:
+            line_cost = estimate_tokens(line, chars_per_token) + 1
+            if line_cost > remaining:
+                # Long unbroken lines (e.g. PDFs without line breaks) are cut mid-line
+                if remaining > 1:
+                    partial.append(line[:int((remaining - 1) * chars_per_token)])
+                break
+            partial.append(line)
+            remaining -= line_cost
+        # A heading on its own is not worth keeping
+        if len(partial) > 1 or (partial and not _heading(partial[0])):
+            kept[i] = partial
+        trimmed.append(name)
+        remaining = 0
+    return kept, trimmed
+
+
+def fit_sections(
+    sections: List[Tuple[str, List[str]]], budget: int, chars_per_token: float
+) -> Tuple[str, List[str]]:
+    """Like trim_sections, but returns the kept sections joined back into text."""
+    kept, trimmed = trim_sections(sections, budget, chars_per_token)
+    return "\n".join(line for i in sorted(kept) for line in kept[i]), trimmed
+
@@ -0,0 +1,230 @@
+"""
+Uploaded resume handling: uploads are copied to a temporary file in chunks
+(with a size cap), the file type is detected from magic bytes rather than the
+filename, and text is extracted per type. DOCX text is read by streaming
+word/document.xml out of the zip through an incremental XML parser, so memory
+stays flat regardless of document size.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
+from typing import BinaryIO, List, Optional, Union
+from xml.etree.ElementTree import ParseError, iterparse
+
+from fastapi import UploadFile
+
+from metrics import span
+from pdf_extraction import PDF_MAX_BYTES, extract_text_from_pdf
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(PDF_MAX_BYTES)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+# Uncompressed size limit for word/document.xml (guards against zip bombs)
+DOCX_MAX_XML_BYTES = int(os.getenv("DOCX_MAX_XML_BYTES", str(50 * 1024 * 1024)))
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+class ResumeFileError(Exception):
+    """Raised when an uploaded resume cannot be read."""
+
+
+class FileTooLargeError(ResumeFileError):
+    """Raised when an upload exceeds UPLOAD_MAX_BYTES."""
+
+
+class UnsupportedFileTypeError(ResumeFileError):
+    """Raised when an upload is not a PDF, DOCX or plain-text file."""
+
+
+class DocxExtractionError(ResumeFileError):
+    """Raised when a DOCX file is damaged or its text cannot be read."""
+
+
+class SpooledUpload:
+    """An upload copied to a temporary file. Call cleanup() once it has been processed."""
+
+    def __init__(self, path: str, filename: str, size: int, sha256: str):
+        self.path = path
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+
+    def cleanup(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class _SpoolWriter:
+    """Writes chunks to a temporary file, hashing them and enforcing the size cap."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.file = tempfile.NamedTemporaryFile(prefix="resume-", dir=UPLOAD_SPOOL_DIR, delete=False)
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise FileTooLargeError(f"Upload is larger than the {self.max_bytes}-byte limit.")
+        self.digest.update(chunk)
+        self.file.write(chunk)  # Small writes land in the page cache; not worth a thread hop
+
+    def finish(self, filename: str) -> SpooledUpload:
+        self.file.close()
+        return SpooledUpload(self.file.name, filename, self.size, self.digest.hexdigest())
+
+    def discard(self) -> None:
+        self.file.close()
+        os.unlink(self.file.name)
+
+
+async def spool_upload(upload: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> SpooledUpload:
+    """Copies an upload to a temporary file chunk by chunk, hashing it on the way."""
+    writer = _SpoolWriter(max_bytes)
+    try:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            writer.write(chunk)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.finish(upload.filename or "")
+
+
+def spool_archive_members(path: str, max_members: int, max_bytes: int = UPLOAD_MAX_BYTES) -> List[SpooledUpload]:
+    """
+    Copies the files in a zip archive to temporary files. The member count and
+    declared sizes are checked before anything is decompressed, and the size
+    cap is enforced again while copying in case the declared sizes lie.
+    """
+    spooled: List[SpooledUpload] = []
+    try:
+        with zipfile.ZipFile(path) as archive:
+            members = [
+                info for info in archive.infolist()
+                if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+            ]
+            if len(members) > max_members:
+                raise FileTooLargeError(f"Archive contains {len(members)} files; at most {max_members} are allowed.")
+            for info in members:
+                if info.file_size > max_bytes:
+                    raise FileTooLargeError(f"{info.filename} is larger than the {max_bytes}-byte limit.")
+            for info in members:
+                writer = _SpoolWriter(max_bytes)
+                try:
+                    with archive.open(info) as member:
+                        while chunk := member.read(UPLOAD_CHUNK_SIZE):
+                            writer.write(chunk)
+                except BaseException:
+                    writer.discard()
+                    raise
+                spooled.append(writer.finish(info.filename))
+    except BaseException:
+        for upload in spooled:
+            upload.cleanup()
+        raise
+    return spooled
+
+
+def _open_source(source: Union[bytes, str]) -> BinaryIO:
+    return open(source, "rb") if isinstance(source, str) else io.BytesIO(source)
+
+
+def detect_file_type(source: Union[bytes, str]) -> str:
+    """Returns "pdf", "docx" or "text" from the file's leading bytes."""
+    with _open_source(source) as f:
+        head = f.read(4096)
+        if head.startswith(b"%PDF-"):
+            return "pdf"
+        if head.startswith(b"PK\x03\x04"):
+            f.seek(0)
+            try:
+                with zipfile.ZipFile(f) as archive:
+                    if "word/document.xml" in archive.namelist():
+                        return "docx"
+            except zipfile.BadZipFile:
+                pass
+            raise UnsupportedFileTypeError("Zip archives other than DOCX files are not supported.")
+    if head.startswith(b"\xd0\xcf\x11\xe0"):
+        raise UnsupportedFileTypeError("Legacy .doc files are not supported; upload a PDF or DOCX.")
+    if b"\x00" in head:
+        raise UnsupportedFileTypeError("Unrecognized binary file; upload a PDF, DOCX or text file.")
+    return "text"
+
+
+def is_zip_archive(source: Union[bytes, str]) -> bool:
+    """True for a zip file that is not a DOCX; a damaged zip counts as an archive so opening it reports the error."""
+    with _open_source(source) as f:
+        if f.read(4) != b"PK\x03\x04":
+            return False
+        f.seek(0)
+        try:
+            with zipfile.ZipFile(f) as archive:
+                return "word/document.xml" not in archive.namelist()
+        except zipfile.BadZipFile:
+            return True
+
+
+def extract_docx_text(source: Union[bytes, str]) -> str:
+    """
+    Streams word/document.xml out of the zip and collects paragraph text with
+    iterparse. Every element is detached from its parent once it has been read,
+    so the tree never holds more than the path to the current element.
+    """
+    paragraph_tag = f"{WORD_NAMESPACE}p"
+    text_tag = f"{WORD_NAMESPACE}t"
+    tab_tag = f"{WORD_NAMESPACE}tab"
+    break_tag = f"{WORD_NAMESPACE}br"
+    text = io.StringIO()
+    parts = []
+    open_elements = []
+    try:
+        with _open_source(source) as f, zipfile.ZipFile(f) as archive:
+            if archive.getinfo("word/document.xml").file_size > DOCX_MAX_XML_BYTES:
+                raise DocxExtractionError("DOCX document body is too large.")
+            with archive.open("word/document.xml") as document:
+                for event, element in iterparse(document, events=("start", "end")):
+                    if event == "start":
+                        open_elements.append(element)
+                        continue
+                    open_elements.pop()
+                    tag = element.tag
+                    if tag == text_tag:
+                        parts.append(element.text or "")
+                    elif tag == tab_tag:
+                        parts.append("\t")
+                    elif tag == break_tag:
+                        parts.append("\n")
+                    elif tag == paragraph_tag:
+                        paragraph = "".join(parts)
+                        parts = []
+                        if paragraph.strip():
+                            text.write(paragraph + "\n")
+                    # Each parent only ever holds the child being read, so this is O(1)
+                    if open_elements:
+                        open_elements[-1].remove(element)
+    except (zipfile.BadZipFile, KeyError, ParseError) as e:
+        raise DocxExtractionError(f"Error reading DOCX: {e}")
+    return text.getvalue().rstrip("\n")
+
+
+def _read_text(source: Union[bytes, str]) -> str:
+    with _open_source(source) as f:
+        return f.read().decode("utf-8", errors="ignore")
+
+
+async def extract_resume_text(source: Union[bytes, str], file_type: Optional[str] = None) -> str:
+    """Extracts text from a resume given as bytes or a file path, dispatching on its detected type."""
+    file_type = file_type or await asyncio.to_thread(detect_file_type, source)
+    with span(f"{file_type}_extraction"):
+        if file_type == "pdf":
+            return await extract_text_from_pdf(source)
+        if file_type == "docx":
+            return await asyncio.to_thread(extract_docx_text, source)
+        return await asyncio.to_thread(_read_text, source)
@@ -0,0 +1,84 @@
+"""
+Section fingerprints for incremental re-analysis. A resume is cleaned, split
+into sections and each section is hashed; diffing the fingerprints against the
+previous upload in the same session tells which sections have to go back to
+the model and which can be represented by the summary it wrote last time.
+"""
+from typing import Dict, List, NamedTuple, Optional
+
+from cache import make_cache_key
+from resume_compaction import (
+    DEFAULT_CHARS_PER_TOKEN,
+    clean_resume_text,
+    estimate_tokens,
+    split_sections,
+    trim_sections,
+)
+
+
+class Section(NamedTuple):
+    name: str  # Unique within a resume: repeated headings get a numeric suffix
+    kind: str  # The section type from split_sections
+    text: str
+    fingerprint: str
+
+
+class SectionDiff(NamedTuple):
+    changed: List[Section]  # Edited or new, or without a summary from the last analysis
+    unchanged: List[Section]
+    removed: List[str]
+
+    @property
+    def changed_ratio(self) -> float:
+        changed = sum(len(section.text) for section in self.changed)
+        total = changed + sum(len(section.text) for section in self.unchanged)
+        return changed / total if total else 1.0
+
+
+def fingerprint_sections(resume_text: str) -> List[Section]:
+    """Splits the cleaned resume into named sections; whitespace-only edits keep a section's fingerprint."""
+    sections = []
+    seen: Dict[str, int] = {}
+    for name, lines in split_sections(clean_resume_text(resume_text)):
+        seen[name] = seen.get(name, 0) + 1
+        label = name if seen[name] == 1 else f"{name}_{seen[name]}"
+        text = "\n".join(lines)
+        sections.append(Section(label, name, text, make_cache_key(" ".join(text.split()))))
+    return sections
+
+
+def diff_sections(session: Dict, sections: List[Section]) -> SectionDiff:
+    fingerprints = session.get("fingerprints", {})
+    summaries = session.get("summaries", {})
+    changed, unchanged = [], []
+    for section in sections:
+        if fingerprints.get(section.name) == section.fingerprint and section.name in summaries:
+            unchanged.append(section)
+        else:
+            changed.append(section)
+    names = {section.name for section in sections}
+    return SectionDiff(changed, unchanged, [name for name in fingerprints if name not in names])
+
+
+def render_sections(sections: List[Section], budget: Optional[int] = None) -> str:
+    """
+    Formats sections as labelled blocks for a prompt, trimming them by section
+    priority when they are over `budget` tokens.
+    """
+    lines = {i: section.text.splitlines() for i, section in enumerate(sections)}
+    if budget is not None and estimate_tokens("\n".join(section.text for section in sections)) > budget:
+        lines, _ = trim_sections(
+            [(section.kind, lines[i]) for i, section in enumerate(sections)], budget, DEFAULT_CHARS_PER_TOKEN
+        )
+    return "\n\n".join(f"[{sections[i].name}]\n" + "\n".join(lines[i]) for i in sorted(lines))
+
+
+def merge_analysis(previous: Dict, update: Dict) -> Dict:
+    """Applies an incremental reply on top of the previous analysis, field by field."""
+    merged = dict(previous)
+    for key, value in update.items():
+        if key == "detailed_analysis" and isinstance(value, dict) and isinstance(previous.get(key), dict):
+            merged[key] = dict(previous[key], **value)
+        else:
+            merged[key] = value
+    return merged
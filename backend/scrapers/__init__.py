@@ -1 +1,21 @@
-from .linkedin_scraper import scrape_linkedin
+import os
+from typing import Dict, List
+
+from .base import JobSource
+from .linkedin_scraper import scrape_linkedin, LinkedInSource
+from .runner import search_sources, stream_sources
+
+SOURCES: Dict[str, JobSource] = {}
+
+
+def register_source(source: JobSource) -> None:
+    SOURCES[source.name] = source
+
+
+def enabled_sources() -> List[JobSource]:
+    """Sources named in JOB_SOURCES (comma-separated, default "linkedin"), in that order."""
+    names = [name.strip() for name in os.getenv("JOB_SOURCES", "linkedin").split(",") if name.strip()]
+    return [SOURCES[name] for name in names if name in SOURCES]
+
+
+register_source(LinkedInSource())
@@ -0,0 +1,18 @@
+from typing import Dict, List
+
+
+class JobSource:
+    """
+    A job board the backend can search. Subclasses set `name` and implement
+    `search`; `deadline` bounds how long the runner waits for the source before
+    returning the other sources' results without it.
+    """
+
+    name = "source"
+    deadline = 15.0
+
+    async def search(self, job_title: str, location: str, keywords: List[str]) -> List[Dict]:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Releases pooled resources (HTTP clients etc.) at shutdown."""
@@ -0,0 +1,33 @@
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters LinkedIn (and campaign links) add per impression; they never identify a job
+TRACKING_PARAMS = {"refid", "trackingid", "trk", "position", "pagenum", "original_referer", "currentjobid"}
+
+_JOB_ID_RE = re.compile(r"/jobs/view/(?:[^/?#]*-)?(\d{6,})")
+
+
+def canonical_job_url(url: str) -> str:
+    """Strips tracking query parameters and fragments so one posting has one URL."""
+    if not url or url == "#":
+        return url
+    parts = urlsplit(url)
+    query = [
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMS and not name.lower().startswith("utm_")
+    ]
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, urlencode(query), ""))
+
+
+def job_id(url: str) -> Optional[str]:
+    match = _JOB_ID_RE.search(url or "")
+    return match.group(1) if match else None
+
+
+def job_identity(url: str) -> str:
+    """
+    Identity used to spot repeated postings: the LinkedIn job ID when the URL
+    has one (regional hosts differ), otherwise the canonical URL.
+    """
+    return job_id(url) or url
@@ -1,44 +1,178 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import httpx
-from bs4 import BeautifulSoup
 import asyncio
+import os
+import random
+import time
+from urllib.parse import urlsplit
+from .base import JobSource
+from .parsers import parse_job_cards
+from metrics import errors, span
 
-async def scrape_linkedin(job_title:str, location: str, _, keywords: List[str]) -> List[Dict]:
-    """
-    Asynchronously scrapes job postings from LinkedIn, tailored to keywords.
-    """
+# Base URL is configurable so the scraper can be pointed at a local stub serving recorded pages
+LINKEDIN_BASE_URL = os.getenv("LINKEDIN_BASE_URL", "https://www.linkedin.com")
+LINKEDIN_PAGE_SIZE = 25
+LINKEDIN_PAGES = int(os.getenv("LINKEDIN_PAGES", "3"))
+LINKEDIN_TARGET_COUNT = int(os.getenv("LINKEDIN_TARGET_COUNT", "60"))
+LINKEDIN_RATE_PER_SECOND = float(os.getenv("LINKEDIN_RATE_PER_SECOND", "2"))
+LINKEDIN_RATE_BURST = int(os.getenv("LINKEDIN_RATE_BURST", "3"))
+LINKEDIN_MAX_RETRIES = int(os.getenv("LINKEDIN_MAX_RETRIES", "3"))
+LINKEDIN_BACKOFF_BASE = float(os.getenv("LINKEDIN_BACKOFF_BASE", "1.0"))
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+try:
+    import h2  # noqa: F401  (HTTP/2 support for httpx is optional)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class RateLimiter:
+    """Token bucket: allows `burst` requests at once, refilled at `rate` per second."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+_client: Optional[httpx.AsyncClient] = None
+_rate_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_client() -> httpx.AsyncClient:
+    """App-lifetime client so connections (and their TLS sessions) are reused across searches."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            headers=HEADERS,
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_rate_limiter(url: str) -> RateLimiter:
+    host = urlsplit(url).netloc
+    if host not in _rate_limiters:
+        _rate_limiters[host] = RateLimiter(LINKEDIN_RATE_PER_SECOND, LINKEDIN_RATE_BURST)
+    return _rate_limiters[host]
+
+
+def build_search_url(job_title: str, location: str, keywords: List[str], start: int = 0) -> str:
     job_title_encoded = job_title.replace(" ", "%20")
     location_encoded = location.replace(" ", "%20")
     keywords_encoded = "%20".join(keywords)
-    url = f"https://www.linkedin.com/jobs/search/?keywords={job_title_encoded}%20{keywords_encoded}&location={location_encoded}" # Removed &level={job_level}
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
+    url = f"{LINKEDIN_BASE_URL}/jobs/search/?keywords={job_title_encoded}%20{keywords_encoded}&location={location_encoded}" # Removed &level={job_level}
+    if start:
+        url += f"&start={start}"
+    return url
+
+
+async def fetch_page(client: httpx.AsyncClient, url: str) -> str:
+    """
+    GETs one results page under the per-host rate limit. 429s are retried with
+    jittered exponential backoff, honouring Retry-After when LinkedIn sends it.
+    """
+    limiter = get_rate_limiter(url)
+    for attempt in range(LINKEDIN_MAX_RETRIES + 1):
+        with span("linkedin_rate_limit"):
+            await limiter.acquire()
+        with span("linkedin_fetch"):
+            response = await client.get(url)
+        if response.status_code != 429 or attempt == LINKEDIN_MAX_RETRIES:
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            job_listings = soup.find_all('div', class_='base-card')
-            jobs = []
-            for job in job_listings:
-                title = job.find('h3', class_='base-search-card__title').text.strip() if job.find('h3', class_='base-search-card__title') else "N/A"
-                company = job.find('h4', class_='base-search-card__subtitle').text.strip() if job.find('h4', class_='base-search-card__subtitle') else "N/A"
-                location_element = job.find('span', class_='job-search-card__location').text.strip() if job.find('span', class_='job-search-card__location') else "N/A"
-                link_element = job.find('a')
-                link = link_element['href'] if link_element and 'href' in link_element.attrs else "#"
-
-                jobs.append({
-                    'title': title,
-                    'company': company,
-                    'location': location_element,
-                    'url': link,
-                    'source': 'linkedin'
-                })
-            return jobs
-    except httpx.RequestError as e:
-        print(f"Error fetching LinkedIn jobs: {e}")
-        return []
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        return []
\ No newline at end of file
+            return response.text
+        errors.inc(stage="linkedin_throttled")
+        retry_after = response.headers.get("Retry-After", "")
+        delay = float(retry_after) if retry_after.isdigit() else LINKEDIN_BACKOFF_BASE * 2 ** attempt
+        await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+
+async def scrape_linkedin(
+    job_title: str,
+    location: str,
+    _,
+    keywords: List[str],
+    pages: int = LINKEDIN_PAGES,
+    target_count: Optional[int] = LINKEDIN_TARGET_COUNT,
+    client: Optional[httpx.AsyncClient] = None,
+) -> List[Dict]:
+    """
+    Asynchronously scrapes job postings from LinkedIn, tailored to keywords.
+    Fetches up to `pages` result pages concurrently and stops early once
+    `target_count` jobs have been collected. Results keep LinkedIn's page order.
+    Raises the fetch error when no page could be fetched, so the source runner
+    reports LinkedIn as failing rather than as having no results.
+    """
+    client = client or get_client()
+
+    async def scrape_page(page: int) -> List[Dict]:
+        html = await fetch_page(client, build_search_url(job_title, location, keywords, page * LINKEDIN_PAGE_SIZE))
+        with span("html_parse"):
+            return parse_job_cards(html)
+
+    tasks = [asyncio.ensure_future(scrape_page(page)) for page in range(max(1, pages))]
+    results: Dict[int, List[Dict]] = {}
+    fetched = 0
+    error: Optional[Exception] = None
+    try:
+        for page, task in enumerate(tasks):
+            try:
+                results[page] = await task
+                fetched += 1
+            except httpx.HTTPError as e:
+                print(f"Error fetching LinkedIn jobs (page {page}): {e}")
+                error, results[page] = error or e, []
+            except Exception as e:
+                print(f"An unexpected error occurred: {e}")
+                error, results[page] = error or e, []
+            if not results[page]:
+                break  # Past the last page of results (or a page failed)
+            collected = sum(len(jobs) for jobs in results.values())
+            if target_count and collected >= target_count:
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    if not fetched and error is not None:
+        raise error
+    jobs = [job for page in sorted(results) for job in results[page]]
+    return jobs[:target_count] if target_count else jobs
+
+
+class LinkedInSource(JobSource):
+    name = "linkedin"
+    deadline = float(os.getenv("LINKEDIN_DEADLINE", "15"))
+
+    async def search(self, job_title: str, location: str, keywords: List[str]) -> List[Dict]:
+        return await scrape_linkedin(job_title, location, "", keywords)
+
+    async def close(self) -> None:
+        await close_client()
@@ -0,0 +1,146 @@
+"""
+Job-card parsers for LinkedIn result pages. Every backend returns the same list
+of dicts; each card is walked once and the first matching element for every
+field is kept, instead of searching the card again per field.
+
+Backends: selectolax and lxml are used when installed, BeautifulSoup with
+html.parser is always available as the fallback. LINKEDIN_PARSER picks one
+explicitly ("selectolax", "lxml", "bs4"); the default "auto" takes the fastest
+available.
+"""
+import os
+from typing import Callable, Dict, List, Optional
+
+TITLE_CLASS = "base-search-card__title"
+COMPANY_CLASS = "base-search-card__subtitle"
+LOCATION_CLASS = "job-search-card__location"
+
+# (field, tag, class) for the text fields of a card
+CARD_FIELDS = (
+    ("title", "h3", TITLE_CLASS),
+    ("company", "h4", COMPANY_CLASS),
+    ("location", "span", LOCATION_CLASS),
+)
+
+LINKEDIN_PARSER = os.getenv("LINKEDIN_PARSER", "auto").lower()
+
+
+def _job(title, company, location, link) -> Dict:
+    return {
+        'title': title if title is not None else "N/A",
+        'company': company if company is not None else "N/A",
+        'location': location if location is not None else "N/A",
+        'url': link if link is not None else "#",
+        'source': 'linkedin'
+    }
+
+
+def parse_with_bs4(html: str) -> List[Dict]:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    jobs = []
+    for card in soup.find_all('div', class_='base-card'):
+        found = {}
+        link = None
+        link_seen = False
+        for element in card.find_all(('h3', 'h4', 'span', 'a')):
+            if element.name == 'a':
+                if not link_seen:
+                    link_seen = True
+                    link = element.attrs.get('href')
+                continue
+            classes = element.get('class') or ()
+            for field, tag, css_class in CARD_FIELDS:
+                if field not in found and element.name == tag and css_class in classes:
+                    found[field] = element.text.strip()
+        jobs.append(_job(found.get('title'), found.get('company'), found.get('location'), link))
+    return jobs
+
+
+def parse_with_lxml(html: str) -> List[Dict]:
+    import lxml.html
+
+    root = lxml.html.fromstring(html)
+    jobs = []
+    for card in root.xpath("//div[contains(concat(' ', normalize-space(@class), ' '), ' base-card ')]"):
+        found = {}
+        link = None
+        link_seen = False
+        for element in card.iter('h3', 'h4', 'span', 'a'):
+            if element is card:
+                continue
+            if element.tag == 'a':
+                if not link_seen:
+                    link_seen = True
+                    link = element.get('href')
+                continue
+            classes = (element.get('class') or '').split()
+            for field, tag, css_class in CARD_FIELDS:
+                if field not in found and element.tag == tag and css_class in classes:
+                    found[field] = element.text_content().strip()
+        jobs.append(_job(found.get('title'), found.get('company'), found.get('location'), link))
+    return jobs
+
+
+def parse_with_selectolax(html: str) -> List[Dict]:
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    jobs = []
+    for card in tree.css('div.base-card'):
+        found = {}
+        link = None
+        link_seen = False
+        for node in card.traverse():
+            if node is card:
+                continue
+            if node.tag == 'a':
+                if not link_seen:
+                    link_seen = True
+                    link = node.attributes.get('href')
+                continue
+            if node.tag not in ('h3', 'h4', 'span'):
+                continue
+            classes = (node.attributes.get('class') or '').split()
+            for field, tag, css_class in CARD_FIELDS:
+                if field not in found and node.tag == tag and css_class in classes:
+                    found[field] = node.text(deep=True).strip()
+        jobs.append(_job(found.get('title'), found.get('company'), found.get('location'), link))
+    return jobs
+
+
+PARSERS: Dict[str, Callable[[str], List[Dict]]] = {
+    "selectolax": parse_with_selectolax,
+    "lxml": parse_with_lxml,
+    "bs4": parse_with_bs4,
+}
+
+_MODULES = {"selectolax": "selectolax.lexbor", "lxml": "lxml.html", "bs4": "bs4"}
+
+
+def available_parsers() -> List[str]:
+    available = []
+    for name, module in _MODULES.items():
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def get_parser(name: str = LINKEDIN_PARSER) -> Callable[[str], List[Dict]]:
+    if name == "auto":
+        return PARSERS[available_parsers()[0]]
+    return PARSERS[name]
+
+
+_parser: Optional[Callable[[str], List[Dict]]] = None
+
+
+def parse_job_cards(html: str) -> List[Dict]:
+    global _parser
+    if _parser is None:
+        _parser = get_parser()
+    return _parser(html)
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List, Tuple
+
+from .base import JobSource
+from .dedupe import canonical_job_url, job_identity
+
+
+async def _run_source(source: JobSource, job_title: str, location: str, keywords: List[str]) -> Tuple[List[Dict], Dict]:
+    """Runs one source under its deadline. Never raises: failures are reported in the status."""
+    start = time.perf_counter()
+    try:
+        jobs = await asyncio.wait_for(source.search(job_title, location, keywords), timeout=source.deadline)
+        status = {"status": "ok"}
+    except asyncio.TimeoutError:
+        jobs, status = [], {"status": "timeout"}
+    except Exception as e:
+        print(f"Job source {source.name} failed: {e}")
+        jobs, status = [], {"status": "error", "error": str(e)}
+    status.update({"elapsed_ms": round(1000 * (time.perf_counter() - start), 1), "count": len(jobs)})
+    return jobs, status
+
+
+def _fingerprint(job: Dict) -> str:
+    return "|".join(" ".join(str(job.get(field, "")).lower().split()) for field in ("title", "company", "location"))
+
+
+class JobMerger:
+    """
+    Merges results from several sources as they arrive. A posting is dropped if
+    its job ID / canonical URL was already seen, or if another source already
+    returned the same title, company and location.
+    """
+
+    def __init__(self):
+        self._identities = set()
+        self._fingerprints: Dict[str, str] = {}
+
+    def add(self, source: str, jobs: List[Dict]) -> List[Dict]:
+        """Returns the jobs from `source` that are new, with canonical URLs."""
+        unique = []
+        for job in jobs:
+            url = canonical_job_url(job.get("url", "#"))
+            identity = job_identity(url)
+            fingerprint = _fingerprint(job)
+            if identity != "#" and identity in self._identities:
+                continue
+            if self._fingerprints.get(fingerprint, source) != source:
+                continue
+            self._identities.add(identity)
+            self._fingerprints.setdefault(fingerprint, source)
+            unique.append(dict(job, url=url))
+        return unique
+
+
+async def stream_sources(
+    sources: List[JobSource], job_title: str, location: str, keywords: List[str]
+) -> AsyncIterator[Tuple[str, List[Dict], Dict]]:
+    """Runs all sources concurrently and yields (source, new_jobs, status) as each one finishes."""
+    merger = JobMerger()
+    tasks = {
+        asyncio.ensure_future(_run_source(source, job_title, location, keywords)): source.name
+        for source in sources
+    }
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                jobs, status = task.result()
+                yield tasks[task], merger.add(tasks[task], jobs), status
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def search_sources(
+    sources: List[JobSource], job_title: str, location: str, keywords: List[str]
+) -> Tuple[List[Dict], Dict[str, Dict]]:
+    """
+    Runs all sources concurrently and returns (merged_jobs, per_source_status).
+    Jobs are merged in source order, so earlier sources win duplicates.
+    """
+    results = await asyncio.gather(*(_run_source(source, job_title, location, keywords) for source in sources))
+    merger = JobMerger()
+    jobs = []
+    report = {}
+    for source, (source_jobs, status) in zip(sources, results):
+        jobs.extend(merger.add(source.name, source_jobs))
+        report[source.name] = status
+    return jobs, report
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+TASK_WORKERS = int(os.getenv("TASK_WORKERS", "4"))
+TASK_QUEUE_MAX = int(os.getenv("TASK_QUEUE_MAX", "100"))
+# Finished tasks are kept this long so clients (and duplicate submissions) can read the result
+TASK_RESULT_TTL = float(os.getenv("TASK_RESULT_TTL", "3600"))
+
+
+class TaskQueueFullError(RuntimeError):
+    """Raised when a task is submitted while the queue is at capacity."""
+
+
+class Task:
+    """One submitted job. `partial` is filled in by the handler while it runs."""
+
+    def __init__(self, key: str, payload: Dict):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.payload = payload
+        self.status = "queued"
+        self.partial: Dict = {}
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        data = {"task_id": self.id, "status": self.status, "created_at": self.created_at}
+        if self.status == "running":
+            data["partial"] = self.partial
+        if self.result is not None:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        if self.finished_at is not None:
+            data["elapsed_ms"] = round(1000 * (self.finished_at - self.created_at), 1)
+        return data
+
+
+class TaskQueue:
+    """
+    In-process submit-and-poll queue with a fixed pool of worker coroutines.
+    Submissions with the same key share one task until it fails or expires.
+    """
+
+    def __init__(self, handler: Callable[[Task], Awaitable[Dict]], workers: int, max_queue: int):
+        self.handler = handler
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._tasks: Dict[str, Task] = {}
+        self._by_key: Dict[str, str] = {}
+        self._workers: List[asyncio.Task] = []
+        self.deduplicated = 0
+
+    def start(self) -> None:
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _work(self) -> None:
+        while True:
+            task = await self._queue.get()
+            task.status = "running"
+            try:
+                task.result = await self.handler(task)
+                task.status = "done"
+            except Exception as e:
+                task.error = str(e)
+                task.status = "failed"
+            finally:
+                task.finished_at = time.time()
+                task.payload = {}  # Drop the uploaded file once it has been processed
+                self._queue.task_done()
+
+    def _expire(self) -> None:
+        cutoff = time.time() - TASK_RESULT_TTL
+        for task_id, task in list(self._tasks.items()):
+            if task.finished_at is not None and task.finished_at < cutoff:
+                del self._tasks[task_id]
+                if self._by_key.get(task.key) == task_id:
+                    del self._by_key[task.key]
+
+    def submit(self, key: str, payload: Dict) -> Task:
+        """Queues a task, or returns the existing one for the same key unless it failed."""
+        self._expire()
+        existing = self._tasks.get(self._by_key.get(key, ""))
+        if existing is not None and existing.status != "failed":
+            self.deduplicated += 1
+            return existing
+
+        task = Task(key, payload)
+        try:
+            self._queue.put_nowait(task)
+        except asyncio.QueueFull:
+            raise TaskQueueFullError(f"Task queue is full ({self._queue.qsize()} waiting).")
+        self._tasks[task.id] = task
+        self._by_key[key] = task.id
+        return task
+
+    def get(self, task_id: str) -> Optional[Task]:
+        return self._tasks.get(task_id)
+
+    def stats(self) -> Dict:
+        counts: Dict[str, int] = {}
+        for task in self._tasks.values():
+            counts[task.status] = counts.get(task.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "tasks": counts,
+            "deduplicated": self.deduplicated,
+        }
@@ -27,7 +27,8 @@ if analysis_result and field_of_interest:
                 job_search_data = {
                     "job_title": field_of_interest,
                     "location": location,
-                    "keywords": extracted_keywords
+                    "keywords": extracted_keywords,
+                    "field_of_interest": analysis_result.get('field_of_interest', '')
                 }
                 # It calls the `get_job_postings_api` endpoint in your backend/main.py
                 response = requests.post(f"{FASTAPI_BASE_URL}/get_job_postings", json=job_search_data)
@@ -44,6 +45,9 @@ if analysis_result and field_of_interest:
                             "Location": [job["location"] for job in top_jobs],
                             "Apply Link": [f'<a href="{job["url"]}" target="_blank">Click Here</a>' for job in top_jobs],
                         }
+                        # Backend ranks postings against the resume keywords when it can
+                        if all("relevance" in job for job in top_jobs):
+                            data["Relevance"] = [f'{job["relevance"]:.0%}' for job in top_jobs]
                         df = pd.DataFrame(data)
                         st.markdown(df.to_markdown(index=False), unsafe_allow_html=True)
                     else:
@@ -1,6 +1,9 @@
+import hashlib
 import streamlit as st
 import requests
 import os
+import time
+import uuid
 
 st.set_page_config(page_title="Career Guide", page_icon="📄", layout="centered")
 
@@ -14,57 +17,118 @@ FASTAPI_BASE_URL = os.getenv("FASTAPI_BASE_URL", "http://localhost:8000")
 uploaded_file = st.file_uploader("Upload your resume (PDF or DOCX)", type=["pdf", "docx"])
 job_title = st.text_input("Enter your preferrred job title:", "")
 
-if uploaded_file and job_title:
-    with st.spinner("Analyzing your resume..."):
-        files = {"resume": uploaded_file}  # Pass the uploaded file object directly
-        data = {"job_title": job_title}
-
-        response = requests.post(f"{FASTAPI_BASE_URL}/analyze_resume", files=files, data=data)
-
-    if response.status_code == 200:
-        try:
-            result = response.json()
-            st.success("Analysis complete!")
-
-            # Storing results for detailed analysis page
-            st.session_state['analysis_result'] = result
-            st.session_state['uploaded_file'] = uploaded_file
-
-            # Display results
-            st.markdown(f"### ✅ Resume Score: `{result.get('score', 'N/A')}/100`")
-            st.markdown("### 💡 Suggestions:")
-            suggestions = result.get("suggestions", [])
-            if suggestions:
-                for i, suggestion in enumerate(suggestions, 1):
-                    st.markdown(f"{i}. {suggestion}")
-            else:
-                st.markdown("No specific suggestions found.")
-
-            st.markdown(f"### 🎯 Field of Interest: `{result.get('field_of_interest', 'N/A')}`")
-
-            # Action options
-            st.markdown("---")
-            st.markdown("### What would you like to do next?")
-
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                if st.button("🔍 See Job Postings"):
-                    st.switch_page("pages/job_postings.py")
-
-            with col2:
-                if st.button("🛠️ Build My Roadmap"):
-                    st.session_state['interest'] = result.get("field_of_interest", "")
-                    st.switch_page("pages/roadmap.py")
-            with col3:
-                if st.button("🧐 Detailed Analysis"):
-                    st.switch_page("pages/detailed_analysis.py")
-
-        except Exception as e:
-            st.error(f"Error processing the analysis result: {e}")
-            st.error(f"Raw response: {response.text}") # For debugging
+# Seconds between status checks while an analysis task runs
+POLL_INTERVAL = 0.5
+
+def submit_analysis(uploaded_file, job_title) -> str:
+    """Queues an analysis on the backend and returns its task ID."""
+    files = {"resume": (uploaded_file.name, uploaded_file.getvalue())}
+    # Re-uploads in the same browser session only re-analyze the sections that changed
+    session_id = st.session_state.setdefault('analysis_session_id', uuid.uuid4().hex)
+    data = {"job_title": job_title, "session_id": session_id}
+    response = requests.post(f"{FASTAPI_BASE_URL}/analysis_tasks", files=files, data=data)
+    if response.status_code != 202:
+        raise RuntimeError(f"Status code: {response.status_code}. Response text: {response.text}")
+    return response.json()["task_id"]
+
+def get_analysis_task(task_id: str):
+    """Returns the task status, or None if the backend no longer knows the task."""
+    response = requests.get(f"{FASTAPI_BASE_URL}/analysis_tasks/{task_id}")
+    if response.status_code == 404:
+        return None
+    if response.status_code != 200:
+        raise RuntimeError(f"Status code: {response.status_code}. Response text: {response.text}")
+    return response.json()
+
+def render_score(slot, score):
+    slot.markdown(f"### ✅ Resume Score: `{score}/100`")
+
+def render_suggestions(slot, suggestions):
+    if suggestions:
+        lines = "\n".join(f"{i}. {suggestion}" for i, suggestion in enumerate(suggestions, 1))
+        slot.markdown(f"### 💡 Suggestions:\n{lines}")
     else:
-        st.error(f"Something went wrong. Please try again. Status code: {response.status_code}")
-        st.error(f"Response text: {response.text}")
+        slot.markdown("### 💡 Suggestions:\nNo specific suggestions found.")
+
+def render_field(slot, field):
+    slot.markdown(f"### 🎯 Field of Interest: `{field}`")
+
+if uploaded_file and job_title:
+    # Placeholders are filled in as fields arrive from the backend
+    status_slot = st.empty()
+    score_slot = st.empty()
+    suggestions_slot = st.empty()
+    field_slot = st.empty()
+    result = None
+
+    # Every widget interaction reruns this script, so the task for this file and
+    # job title is kept in session state and only submitted once
+    # Keyed on the file's content: an edited resume may keep its name and size
+    submission = (hashlib.sha256(uploaded_file.getvalue()).hexdigest(), job_title)
+    task_state = st.session_state.get('analysis_task')
+    try:
+        if not task_state or task_state['submission'] != submission:
+            task_state = {"submission": submission, "task_id": submit_analysis(uploaded_file, job_title), "result": None}
+            st.session_state['analysis_task'] = task_state
+
+        if task_state['result'] is None:
+            with st.spinner("Analyzing your resume..."):
+                while True:
+                    task = get_analysis_task(task_state['task_id'])
+                    if task is None or task['status'] == 'failed':
+                        # Forget the task so the next rerun submits a fresh one
+                        st.session_state.pop('analysis_task', None)
+                        raise RuntimeError(task.get('error') if task else "The analysis task expired.")
+                    if task['status'] == 'done':
+                        task_state['result'] = task['result']
+                        break
+
+                    partial = task.get('partial', {})
+                    if task['status'] == 'queued':
+                        status_slot.info("Waiting for a free analysis worker...")
+                    elif partial:
+                        status_slot.info("Resume text extracted. Waiting for the analysis...")
+                    if "provisional_score" in partial and "score" not in partial:
+                        score_slot.markdown(f"### ⏳ Provisional Score: `{partial['provisional_score']}/100` (refining...)")
+                    if "score" in partial:
+                        render_score(score_slot, partial["score"])
+                    if "suggestions" in partial:
+                        render_suggestions(suggestions_slot, partial["suggestions"])
+                    if "field_of_interest" in partial:
+                        render_field(field_slot, partial["field_of_interest"])
+                    time.sleep(POLL_INTERVAL)
+        result = task_state['result']
+    except Exception as e:
+        st.error(f"Something went wrong. Please try again. {e}")
+
+    if result:
+        status_slot.success("Analysis complete!")
+
+        # Storing results for detailed analysis page
+        st.session_state['analysis_result'] = result
+        st.session_state['uploaded_file'] = uploaded_file
+
+        # Display final results
+        render_score(score_slot, result.get('score', 'N/A'))
+        render_suggestions(suggestions_slot, result.get("suggestions", []))
+        render_field(field_slot, result.get('field_of_interest', 'N/A'))
+
+        # Action options
+        st.markdown("---")
+        st.markdown("### What would you like to do next?")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("🔍 See Job Postings"):
+                st.switch_page("pages/job_postings.py")
+
+        with col2:
+            if st.button("🛠️ Build My Roadmap"):
+                st.session_state['interest'] = result.get("field_of_interest", "")
+                st.switch_page("pages/roadmap.py")
+        with col3:
+            if st.button("🧐 Detailed Analysis"):
+                st.switch_page("pages/detailed_analysis.py")
 elif uploaded_file and not job_title:
     st.warning("Please enter a job title to analyze your resume.")
 elif job_title and not uploaded_file: